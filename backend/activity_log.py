@@ -0,0 +1,172 @@
+"""
+Asynchronous, batched activity log writer.
+
+Request handlers hand rows to a bounded in-process queue and move on; a
+background task collects rows for up to ACTIVITY_FLUSH_INTERVAL seconds
+and bulk-inserts up to ACTIVITY_BATCH_SIZE rows per transaction.
+
+When the queue is full, or a batch cannot be written, rows are appended
+to ACTIVITY_SPILL_FILE (JSON lines) if one is configured and dropped
+otherwise; the spill file is replayed into the database on the next
+startup. Whatever is still queued at shutdown is written before exit.
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from database import SessionLocal
+from models import ActivityLog
+
+ACTIVITY_QUEUE_SIZE = int(os.getenv("ACTIVITY_QUEUE_SIZE", 10000))
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", 200))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", 1))
+ACTIVITY_SPILL_FILE = os.getenv("ACTIVITY_SPILL_FILE", "")
+
+_queue = None
+_writer = None
+_stats = {
+    "enqueued": 0,
+    "written": 0,
+    "batches": 0,
+    "spilled": 0,
+    "replayed": 0,
+    "dropped": 0,
+    "failed_batches": 0,
+    "max_queue_depth": 0,
+    "last_batch_seconds": 0.0
+}
+
+
+def enqueue_activity(user_id: int, activity_type: str, details: dict,
+                     ip_address: str = None, user_agent: str = None):
+    """Queue one activity log row; never blocks the caller"""
+    row = {
+        "user_id": user_id,
+        "activity_type": activity_type,
+        "details": details,
+        "ip_address": ip_address,
+        "user_agent": user_agent,
+        "created_at": datetime.utcnow()
+    }
+    if _queue is None:
+        # No writer running (scripts, tests): write straight through
+        _write_batch([row])
+        return
+
+    try:
+        _queue.put_nowait(row)
+    except asyncio.QueueFull:
+        _spill([row])
+        return
+    _stats["enqueued"] += 1
+    _stats["max_queue_depth"] = max(_stats["max_queue_depth"], _queue.qsize())
+
+
+def _write_batch(rows: list) -> bool:
+    start = time.monotonic()
+    db = SessionLocal()
+    try:
+        db.execute(insert(ActivityLog), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        _stats["failed_batches"] += 1
+        print(f"⚠️  Activity log batch of {len(rows)} failed: {e}")
+        return False
+    finally:
+        db.close()
+    _stats["written"] += len(rows)
+    _stats["batches"] += 1
+    _stats["last_batch_seconds"] = round(time.monotonic() - start, 4)
+    return True
+
+
+def _spill_line(row: dict) -> str:
+    return json.dumps({**row, "created_at": row["created_at"].isoformat()}, default=str) + "\n"
+
+
+def _spill(rows: list):
+    if not ACTIVITY_SPILL_FILE:
+        _stats["dropped"] += len(rows)
+        return
+    with open(ACTIVITY_SPILL_FILE, "a", encoding="utf-8") as f:
+        f.writelines(_spill_line(row) for row in rows)
+    _stats["spilled"] += len(rows)
+
+
+def _replay_spill_file():
+    """Load rows spilled by a previous run into the database"""
+    if not ACTIVITY_SPILL_FILE or not os.path.exists(ACTIVITY_SPILL_FILE):
+        return
+    with open(ACTIVITY_SPILL_FILE, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    for row in rows:
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+
+    for i in range(0, len(rows), ACTIVITY_BATCH_SIZE):
+        if not _write_batch(rows[i:i + ACTIVITY_BATCH_SIZE]):
+            # Keep the unwritten remainder for the next attempt
+            with open(ACTIVITY_SPILL_FILE, "w", encoding="utf-8") as f:
+                f.writelines(_spill_line(row) for row in rows[i:])
+            return
+        _stats["replayed"] += len(rows[i:i + ACTIVITY_BATCH_SIZE])
+    os.remove(ACTIVITY_SPILL_FILE)
+
+
+def _drain(limit: int) -> list:
+    rows = []
+    while len(rows) < limit and not _queue.empty():
+        rows.append(_queue.get_nowait())
+    return rows
+
+
+def _write_or_spill(rows: list):
+    if not _write_batch(rows):
+        _spill(rows)
+
+
+async def _writer_loop():
+    while True:
+        rows = [await _queue.get()]
+        try:
+            # Let a batch build up unless one is already waiting
+            if _queue.qsize() < ACTIVITY_BATCH_SIZE - 1:
+                await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+        finally:
+            rows += _drain(ACTIVITY_BATCH_SIZE - 1)
+            # Off the event loop so request handlers keep running
+            await asyncio.shield(asyncio.to_thread(_write_or_spill, rows))
+
+
+async def start_activity_writer():
+    """Replay any spill file, create the queue and start the writer task"""
+    global _queue, _writer
+    _replay_spill_file()
+    _queue = asyncio.Queue(maxsize=ACTIVITY_QUEUE_SIZE)
+    _writer = asyncio.create_task(_writer_loop())
+
+
+async def stop_activity_writer():
+    """Stop the writer task and write everything still queued"""
+    global _queue, _writer
+    if _writer is not None:
+        _writer.cancel()
+        await asyncio.gather(_writer, return_exceptions=True)
+        _writer = None
+    if _queue is not None:
+        while not _queue.empty():
+            _write_or_spill(_drain(ACTIVITY_BATCH_SIZE))
+        _queue = None
+
+
+def activity_log_stats() -> dict:
+    return {
+        **_stats,
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queue_capacity": ACTIVITY_QUEUE_SIZE,
+        "spill_file": ACTIVITY_SPILL_FILE or None
+    }
@@ -1,11 +1,174 @@
 import os
-from openai import OpenAI
+import asyncio
+import random
+import time
+import httpx
+import openai
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import json
 
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from prompt_builder import (
+    build_prompt, count_tokens, SYSTEM_PROMPT, AI_COMPLETION_MAX_TOKENS
+)
+
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Evaluator configuration
+AI_EVAL_MODEL = os.getenv("AI_EVAL_MODEL", "gpt-4o")
+AI_EVAL_CONCURRENCY = int(os.getenv("AI_EVAL_CONCURRENCY", 8))
+AI_EVAL_TIMEOUT = float(os.getenv("AI_EVAL_TIMEOUT", 30))
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. http://localhost:8001/v1 for fake_llm_server.py
+AI_BREAKER_FAILURES = int(os.getenv("AI_BREAKER_FAILURES", 5))
+AI_BREAKER_COOLDOWN = float(os.getenv("AI_BREAKER_COOLDOWN", 60))
+
+# One pooled HTTP client for the whole process so connections to the
+# API are kept alive between evaluations instead of re-handshaking.
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=AI_EVAL_CONCURRENCY,
+        max_keepalive_connections=AI_EVAL_CONCURRENCY
+    ),
+    timeout=httpx.Timeout(AI_EVAL_TIMEOUT, connect=5.0)
+)
+
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    base_url=OPENAI_BASE_URL,
+    http_client=_http_client,
+    timeout=AI_EVAL_TIMEOUT,
+    max_retries=1
+)
+
+# Caps in-flight LLM calls per worker; extra submissions wait here
+# without blocking the event loop.
+_eval_semaphore = asyncio.Semaphore(AI_EVAL_CONCURRENCY)
+
+# Trips after consecutive transport/5xx/429 failures so an outage fails
+# fast instead of every submission waiting out the full timeout.
+ai_breaker = CircuitBreaker("openai", AI_BREAKER_FAILURES, AI_BREAKER_COOLDOWN)
+
+_usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "truncated_prompts": 0}
+
+
+async def close_ai_client():
+    """Close pooled connections to the AI provider"""
+    await client.close()
+
+
+def usage_stats() -> dict:
+    calls = _usage["calls"]
+    return {
+        **_usage,
+        "avg_prompt_tokens": round(_usage["prompt_tokens"] / calls) if calls else 0,
+        "avg_completion_tokens": round(_usage["completion_tokens"] / calls) if calls else 0
+    }
+
+
+def _is_transient(error: Exception) -> bool:
+    """Errors that say the provider is unavailable rather than the request being bad"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+async def _request_evaluation(prompt: str, llm: AsyncOpenAI = client) -> dict:
+    """Send one evaluation prompt to the LLM; raises on API or parse errors"""
+    async with _eval_semaphore:
+        ai_breaker.before_call()
+        started = time.monotonic()
+        try:
+            response = await llm.chat.completions.create(
+                model=AI_EVAL_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=AI_COMPLETION_MAX_TOKENS
+            )
+            ai_breaker.record_success()
+        except Exception as e:
+            if _is_transient(e):
+                ai_breaker.record_failure(time.monotonic() - started)
+            else:
+                # The provider answered (e.g. a 400): it is up
+                ai_breaker.record_success()
+            raise
+        finally:
+            # A cancelled call (shutdown, stream cleanup) records nothing;
+            # a half-open trial must not stay in flight forever
+            ai_breaker.release_trial()
+    
+    usage = {
+        "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
+        "completion_tokens": response.usage.completion_tokens if response.usage else 0
+    }
+    _usage["calls"] += 1
+    _usage["prompt_tokens"] += usage["prompt_tokens"]
+    _usage["completion_tokens"] += usage["completion_tokens"]
+    
+    result_text = response.choices[0].message.content.strip()
+    
+    # Try to parse JSON
+    try:
+        result = json.loads(result_text)
+    except json.JSONDecodeError:
+        # Try to extract JSON from markdown code blocks
+        if "```json" in result_text:
+            result_text = result_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_text:
+            result_text = result_text.split("```")[1].split("```")[0].strip()
+        
+        result = json.loads(result_text)
+    
+    # Ensure all required fields exist
+    score = float(result.get('score', 0))
+    status = result.get('status', 'failed')
+    feedback = result.get('feedback', 'Code evaluated.')
+    
+    return {
+        "score": min(max(score, 0), 10),  # Clamp between 0-10
+        "status": status,
+        "feedback": feedback,
+        "details": {
+            "correctness": result.get('correctness', 0),
+            "code_quality": result.get('code_quality', 0),
+            "efficiency": result.get('efficiency', 0),
+            "edge_cases": result.get('edge_cases', 0)
+        },
+        "suggestions": result.get('suggestions', ''),
+        "usage": usage
+    }
+
+
+def _fallback_evaluation(retryable: bool = False) -> dict:
+    """
+    Default score used when the AI evaluation fails.
+    retryable marks outages (open breaker, timeouts, 429/5xx) where the
+    submission should be evaluated again later rather than kept at 5.0.
+    """
+    return {
+        "score": 5.0,
+        "status": "partial",
+        "feedback": "Code received but could not be fully evaluated. Manual review may be required.",
+        "details": {
+            "correctness": 2,
+            "code_quality": 2,
+            "efficiency": 1,
+            "edge_cases": 0
+        },
+        "suggestions": "Error in automatic evaluation.",
+        "fallback": True,
+        "retryable": retryable
+    }
 
 
 async def evaluate_code_with_ai(
@@ -20,131 +183,177 @@ async def evaluate_code_with_ai(
     Evaluate code using GPT-4o without execution.
     Returns score (0-10), status, and feedback.
     """
+    prompt, truncated = build_prompt(
+        code, language, problem_description, sample_input, sample_output, constraints
+    )
+    if truncated:
+        _usage["truncated_prompts"] += 1
     
-    prompt = f"""You are an expert code evaluator for a hackathon. Analyze the following code submission.
-
-**Problem Description:**
-{problem_description}
-
-**Sample Input:**
-{sample_input}
-
-**Expected Output:**
-{sample_output}
-
-{f"**Constraints:**\n{constraints}" if constraints else ""}
-
-**Submitted Code ({language}):**
-```{language}
-{code}
-```
-
-**Evaluation Criteria:**
-1. **Correctness (40%)**: Does the logic correctly solve the problem for the given sample?
-2. **Code Quality (30%)**: Is the code clean, readable, and well-structured?
-3. **Efficiency (20%)**: Is the algorithm efficient? Any obvious optimizations?
-4. **Edge Cases (10%)**: Does it handle edge cases mentioned in constraints?
-
-**Important:** 
-- Do NOT execute the code
-- Analyze the logic and algorithm
-- Check if it would produce the expected output for the sample input
-- Consider time/space complexity
-
-**Response Format (JSON only):**
-{{
-    "score": <0-10>,
-    "status": "<passed/failed/partial>",
-    "correctness": <0-4>,
-    "code_quality": <0-3>,
-    "efficiency": <0-2>,
-    "edge_cases": <0-1>,
-    "feedback": "<detailed feedback in 2-3 sentences>",
-    "suggestions": "<improvement suggestions if any>"
-}}
-
-Provide only valid JSON, no additional text."""
-
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert programming judge. Analyze code submissions and provide scores in JSON format only."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=500
-        )
-        
-        result_text = response.choices[0].message.content.strip()
-        
-        # Try to parse JSON
-        try:
-            result = json.loads(result_text)
-        except json.JSONDecodeError:
-            # Try to extract JSON from markdown code blocks
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
-            result = json.loads(result_text)
-        
-        # Ensure all required fields exist
-        score = float(result.get('score', 0))
-        status = result.get('status', 'failed')
-        feedback = result.get('feedback', 'Code evaluated.')
-        
-        return {
-            "score": min(max(score, 0), 10),  # Clamp between 0-10
-            "status": status,
-            "feedback": feedback,
-            "details": {
-                "correctness": result.get('correctness', 0),
-                "code_quality": result.get('code_quality', 0),
-                "efficiency": result.get('efficiency', 0),
-                "edge_cases": result.get('edge_cases', 0)
-            },
-            "suggestions": result.get('suggestions', '')
-        }
-        
+        return await _request_evaluation(prompt)
+    except CircuitOpenError:
+        # Degraded mode: don't wait on a provider that is known to be down
+        return _fallback_evaluation(retryable=True)
     except Exception as e:
         print(f"AI Evaluation Error: {e}")
         # Return a default score if AI fails
-        return {
-            "score": 5.0,
-            "status": "partial",
-            "feedback": "Code received but could not be fully evaluated. Manual review may be required.",
-            "details": {
-                "correctness": 2,
-                "code_quality": 2,
-                "efficiency": 1,
-                "edge_cases": 0
-            },
-            "suggestions": "Error in automatic evaluation."
-        }
-
-
-async def batch_evaluate_codes(submissions: list) -> list:
+        return _fallback_evaluation(retryable=_is_transient(e))
+
+
+# ============== BATCH EVALUATION ==============
+
+BATCH_RPM = int(os.getenv("AI_BATCH_RPM", 500))
+BATCH_TPM = int(os.getenv("AI_BATCH_TPM", 300000))
+BATCH_MAX_RETRIES = int(os.getenv("AI_BATCH_MAX_RETRIES", 5))
+BATCH_MAX_RETRY_DELAY = 60  # seconds; caps a server-sent Retry-After
+
+# Batch calls do their own backoff, so the client must not retry as well
+_batch_client = client.with_options(max_retries=0)
+
+
+class RateLimiter:
+    """Token buckets enforcing requests-per-minute and tokens-per-minute budgets"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens fit in the budget"""
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                )
+                await asyncio.sleep(wait)
+
+
+def _estimate_tokens(prompt: str) -> int:
+    return count_tokens(SYSTEM_PROMPT) + count_tokens(prompt) + AI_COMPLETION_MAX_TOKENS
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Honour Retry-After (up to BATCH_MAX_RETRY_DELAY) when the API sends it, else exponential backoff with jitter"""
+    if isinstance(error, CircuitOpenError):
+        return max(error.retry_after, 1.0)
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), BATCH_MAX_RETRY_DELAY)
+            except ValueError:
+                pass
+    return min(BATCH_MAX_RETRY_DELAY, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+async def _evaluate_with_retries(submission: dict, limiter: RateLimiter, stats: dict) -> dict:
+    prompt, truncated = build_prompt(
+        code=submission['code'],
+        language=submission['language'],
+        problem_description=submission['problem_description'],
+        sample_input=submission['sample_input'],
+        sample_output=submission['sample_output'],
+        constraints=submission.get('constraints')
+    )
+    if truncated:
+        _usage["truncated_prompts"] += 1
+    
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        await limiter.acquire(_estimate_tokens(prompt))
+        try:
+            return await _request_evaluation(prompt, _batch_client)
+        except Exception as e:
+            retryable = _is_transient(e) or isinstance(e, CircuitOpenError)
+            if not retryable or attempt == BATCH_MAX_RETRIES:
+                print(f"AI Evaluation Error: {e}")
+                stats["failed"] += 1
+                return _fallback_evaluation(retryable=retryable)
+            stats["retries"] += 1
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+
+async def stream_batch_evaluations(
+    submissions: list,
+    concurrency: int = AI_EVAL_CONCURRENCY,
+    rpm: int = BATCH_RPM,
+    tpm: int = BATCH_TPM,
+    on_progress=None
+):
+    """
+    Evaluate submissions concurrently within the rate-limit budgets.
+    Yields (index, result) pairs as evaluations finish; on_progress, if
+    given, is called with a stats dict after each one. concurrency is
+    capped at AI_EVAL_CONCURRENCY, the per-process limit on in-flight
+    calls (and pooled connections) shared with live evaluations.
+    """
+    limiter = RateLimiter(rpm, tpm)
+    results = asyncio.Queue()
+    pending = iter(enumerate(submissions))
+    stats = {
+        "total": len(submissions),
+        "completed": 0,
+        "failed": 0,
+        "retries": 0,
+        "elapsed": 0.0,
+        "throughput_per_min": 0.0
+    }
+    start = time.monotonic()
+    
+    async def worker():
+        for index, submission in pending:
+            try:
+                result = await _evaluate_with_retries(submission, limiter, stats)
+            except Exception as e:
+                # e.g. a submission missing a field; the consumer still gets a result for it
+                print(f"AI Evaluation Error on submission {index}: {e!r}")
+                stats["failed"] += 1
+                result = _fallback_evaluation()
+            results.put_nowait((index, result))
+    
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(concurrency, AI_EVAL_CONCURRENCY, len(submissions)))
+    ]
+    try:
+        for _ in range(len(submissions)):
+            index, result = await results.get()
+            stats["completed"] += 1
+            stats["elapsed"] = round(time.monotonic() - start, 2)
+            stats["throughput_per_min"] = round(stats["completed"] * 60 / max(stats["elapsed"], 1e-6), 1)
+            if on_progress:
+                on_progress(dict(stats))
+            yield index, result
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def batch_evaluate_codes(submissions: list, **kwargs) -> list:
     """
     Evaluate multiple code submissions in batch
     """
-    results = []
-    for submission in submissions:
-        result = await evaluate_code_with_ai(
-            code=submission['code'],
-            language=submission['language'],
-            problem_description=submission['problem_description'],
-            sample_input=submission['sample_input'],
-            sample_output=submission['sample_output'],
-            constraints=submission.get('constraints')
-        )
-        results.append(result)
+    results = [None] * len(submissions)
+    async for index, result in stream_batch_evaluations(submissions, **kwargs):
+        results[index] = result
     
-    return results
\ No newline at end of file
+    return results
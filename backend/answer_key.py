@@ -0,0 +1,199 @@
+"""
+MCQ answer key shared by all worker processes.
+
+The key lives in one named shared memory segment, so every uvicorn
+worker on the host maps the same pages instead of holding its own copy.
+Layout: an 8-byte header (magic, generation) followed by two equal
+slots, each a 4-byte highest id and two bytes per question id: option
+code (0 = none, 1-4 = A-D) and marks. Grading is an index into that
+buffer; questions missing from the key (added since the last publish,
+or beyond ANSWER_KEY_CAPACITY) fall back to the database.
+
+A published slot is never written again while it is live. Publishing
+fills the other slot and then bumps the generation, whose parity names
+the live slot. Readers check the generation is unchanged after
+reading. If it changed, the slot may have been rewritten under them, so
+they read again. Publishers on the host take a file lock, so they don't
+write the same slot at once.
+
+The key is published at startup, by seed_questions.py, and by the admin
+refresh endpoint.
+"""
+import os
+import struct
+import sys
+import tempfile
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import MCQQuestion
+
+ANSWER_KEY_SHM_NAME = os.getenv("ANSWER_KEY_SHM_NAME", "techfest_answer_key")
+ANSWER_KEY_CAPACITY = int(os.getenv("ANSWER_KEY_CAPACITY", 100000))
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; publishes are then unserialized
+    fcntl = None
+
+_HEADER = struct.Struct("<4sI")    # magic, generation
+_SLOT_HEADER = struct.Struct("<I")  # highest id in the slot
+_MAGIC = b"AKY2"
+_OPTIONS = "ABCD"
+_ATTACH_ATTEMPTS = 5
+_READ_ATTEMPTS = 5
+_LOCK_PATH = os.path.join(tempfile.gettempdir(), f"{ANSWER_KEY_SHM_NAME}.lock")
+
+_segment = None
+_buffer = None
+
+
+def _open_segment(create: bool, size: int):
+    """Open (or create) the named segment without tying its lifetime to this process"""
+    kwargs = {"create": True, "size": size} if create else {}
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=ANSWER_KEY_SHM_NAME, track=False, **kwargs)
+    segment = shared_memory.SharedMemory(name=ANSWER_KEY_SHM_NAME, **kwargs)
+    if os.name == "posix":
+        # The segment outlives any single process (workers restart, the seed
+        # script exits), so keep the resource tracker from unlinking it. It
+        # tracks POSIX segments under their "/"-prefixed name.
+        resource_tracker.unregister("/" + ANSWER_KEY_SHM_NAME, "shared_memory")
+    return segment
+
+
+def _attach():
+    """Map the shared segment, creating it on first use"""
+    global _segment, _buffer
+    if _buffer is not None:
+        return _buffer
+
+    size = _HEADER.size + 2 * (_SLOT_HEADER.size + 2 * (ANSWER_KEY_CAPACITY + 1))
+    error = None
+    for _ in range(_ATTACH_ATTEMPTS):
+        try:
+            try:
+                _segment = _open_segment(create=False, size=size)
+            except FileNotFoundError:
+                _segment = _open_segment(create=True, size=size)
+            _buffer = _segment.buf
+            return _buffer
+        except FileExistsError as e:
+            # Another worker created it between our attach and create; attach to theirs
+            error = e
+        except ValueError as e:
+            # Mapped before the creator finished sizing it
+            error = e
+            time.sleep(0.05)
+        except OSError as e:
+            error = e
+            break
+
+    print(f"⚠️  Shared answer key unavailable ({error}); using a per-process copy")
+    _segment = None
+    _buffer = memoryview(bytearray(size))
+    return _buffer
+
+
+def publish_answer_key(db: Session = None) -> int:
+    """Rebuild the key from the database; returns the number of questions"""
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        rows = db.query(MCQQuestion.id, MCQQuestion.correct_option, MCQQuestion.marks).all()
+    finally:
+        if own_session:
+            db.close()
+
+    buf = _attach()
+    slot_size = _slot_size(buf)
+    capacity = (slot_size - _SLOT_HEADER.size) // 2 - 1
+    entries = bytearray(2 * (capacity + 1))
+    highest = stored = 0
+    for question_id, correct_option, marks in rows:
+        if question_id > capacity or correct_option not in _OPTIONS or not 0 <= (marks or 0) <= 255:
+            continue  # Served from the database instead
+        entries[2 * question_id] = _OPTIONS.index(correct_option) + 1
+        entries[2 * question_id + 1] = marks or 0
+        highest = max(highest, question_id)
+        stored += 1
+
+    with open(_LOCK_PATH, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        magic, generation = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            generation = 0
+        # Fill the slot readers aren't using, then switch them over
+        offset = _slot_offset(buf, (generation + 1) % 2)
+        _SLOT_HEADER.pack_into(buf, offset, highest)
+        buf[offset + _SLOT_HEADER.size:offset + _SLOT_HEADER.size + len(entries)] = entries
+        _HEADER.pack_into(buf, 0, _MAGIC, generation + 1)
+
+    if stored < len(rows):
+        print(f"⚠️  {len(rows) - stored} MCQ questions not in the shared answer key")
+    return stored
+
+
+def _slot_size(buf) -> int:
+    return (len(buf) - _HEADER.size) // 2
+
+
+def _slot_offset(buf, slot: int) -> int:
+    return _HEADER.size + slot * _slot_size(buf)
+
+
+def _read_slot(buf, slot: int, question_id: int):
+    offset = _slot_offset(buf, slot)
+    (highest,) = _SLOT_HEADER.unpack_from(buf, offset)
+    if not 0 < question_id <= highest:
+        return None
+    offset += _SLOT_HEADER.size + 2 * question_id
+    code, marks = buf[offset], buf[offset + 1]
+    if not code:
+        return None
+    return _OPTIONS[code - 1], marks
+
+
+def _lookup(question_id: int):
+    buf = _attach()
+    for _ in range(_READ_ATTEMPTS):
+        magic, generation = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            return None
+        entry = _read_slot(buf, generation % 2, question_id)
+        if _HEADER.unpack_from(buf, 0)[1] == generation:
+            return entry
+        # Republished while we read: the slot may have been overwritten
+    return None  # keeps being republished; ask the database
+
+
+def answer_key_entries(db: Session, question_ids) -> dict:
+    """question id -> (correct option, marks); unknown ids are left out"""
+    entries = {}
+    missing = []
+    for question_id in question_ids:
+        entry = _lookup(question_id)
+        if entry:
+            entries[question_id] = entry
+        else:
+            missing.append(question_id)
+
+    if missing:
+        rows = db.query(MCQQuestion.id, MCQQuestion.correct_option, MCQQuestion.marks).filter(
+            MCQQuestion.id.in_(missing)
+        ).all()
+        for question_id, correct_option, marks in rows:
+            entries[question_id] = (correct_option, marks)
+    return entries
+
+
+def close_answer_key():
+    """Unmap the segment in this process (it stays available to others)"""
+    global _segment, _buffer
+    if _segment is not None:
+        _segment.close()
+    _segment = _buffer = None
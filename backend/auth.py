@@ -4,8 +4,13 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+import httpx
+from google.auth import jwt as google_jwt
 
 load_dotenv()
 
@@ -15,6 +20,19 @@ ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+GOOGLE_CERTS_DEFAULT_TTL = 3600  # used when the response has no max-age
+GOOGLE_CERTS_MIN_REFRESH = float(os.getenv("GOOGLE_CERTS_MIN_REFRESH", 60))  # seconds between forced refetches
+GOOGLE_TOKEN_MEMO_TTL = float(os.getenv("GOOGLE_TOKEN_MEMO_TTL", 300))
+GOOGLE_TOKEN_MEMO_SIZE = int(os.getenv("GOOGLE_TOKEN_MEMO_SIZE", 10000))
+
+_google_http = httpx.Client(timeout=5.0)
+_certs = None
+_certs_expire_at = 0.0
+_certs_fetched_at = float("-inf")
+_certs_lock = threading.Lock()
+_verified_tokens = OrderedDict()  # sha256(token) -> (expires at, google user)
+_verified_lock = threading.Lock()
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -41,23 +59,80 @@ def verify_token(token: str):
         return None
 
 
+# ============== GOOGLE ID TOKENS ==============
+# Tokens are verified locally against Google's signing certificates,
+# fetched over one reused connection and cached for as long as the
+# response's Cache-Control allows. A token naming an unknown key id
+# forces a refetch at most once per GOOGLE_CERTS_MIN_REFRESH seconds, so
+# forged tokens can't make us hammer Google. Tokens verified recently
+# are remembered by hash, so a retried login costs a dictionary lookup.
+# verify_google_token blocks on the network; call it from a thread.
+
+def _certs_max_age(cache_control: str) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control or "")
+    return int(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_TTL
+
+
+def _google_certs(force_refresh: bool = False) -> dict:
+    """Google's current signing certificates (key id -> PEM)"""
+    global _certs, _certs_expire_at, _certs_fetched_at
+    with _certs_lock:
+        now = time.monotonic()
+        expired = _certs is None or now >= _certs_expire_at
+        forced = force_refresh and now - _certs_fetched_at >= GOOGLE_CERTS_MIN_REFRESH
+        if expired or forced:
+            response = _google_http.get(GOOGLE_CERTS_URL)
+            response.raise_for_status()
+            _certs = response.json()
+            _certs_fetched_at = now
+            _certs_expire_at = now + _certs_max_age(response.headers.get("cache-control"))
+        return _certs
+
+
+def _remembered_token(token_hash: str):
+    """The Google user for a recently verified token, or None if unknown or expired"""
+    with _verified_lock:
+        entry = _verified_tokens.get(token_hash)
+    if entry is None:
+        return None
+    expire_at, google_user = entry
+    return google_user if time.time() < expire_at else None
+
+
+def _remember_token(token_hash: str, google_user: dict, token_exp: float):
+    expire_at = min(time.time() + GOOGLE_TOKEN_MEMO_TTL, token_exp)
+    with _verified_lock:
+        _verified_tokens[token_hash] = (expire_at, google_user)
+        _verified_tokens.move_to_end(token_hash)
+        while len(_verified_tokens) > GOOGLE_TOKEN_MEMO_SIZE:
+            _verified_tokens.popitem(last=False)
+
+
 def verify_google_token(token: str):
     """Verify Google OAuth token"""
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    remembered = _remembered_token(token_hash)
+    if remembered:
+        return remembered
+    
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
-            GOOGLE_CLIENT_ID
-        )
+        certs = _google_certs()
+        if jwt.get_unverified_header(token).get("kid") not in certs:
+            # Google may have rotated its keys since we cached them
+            certs = _google_certs(force_refresh=True)
+        
+        idinfo = google_jwt.decode(token, certs=certs, audience=GOOGLE_CLIENT_ID, clock_skew_in_seconds=10)
         
         if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
             raise ValueError('Wrong issuer.')
         
-        return {
+        google_user = {
             'email': idinfo['email'],
             'name': idinfo.get('name', ''),
             'picture': idinfo.get('picture', '')
         }
-    except ValueError as e:
+        _remember_token(token_hash, google_user, idinfo['exp'])
+        return google_user
+    except (ValueError, JWTError, httpx.HTTPError) as e:
         print(f"Token verification failed: {e}")
-        return None
\ No newline at end of file
+        return None
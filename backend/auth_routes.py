@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+import asyncio
+import os
 from sqlalchemy.orm import Session
 
 from database import get_db
@@ -6,20 +8,30 @@ from models import User, Notification
 from schemas import (
     GoogleAuthRequest, TokenResponse, UserResponse, UserProfileUpdate
 )
+from activity_log import enqueue_activity
+from user_cache import get_cached_user, invalidate_user
 from auth import verify_google_token, create_access_token, verify_token
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from notification_hub import publish_notification
+from unread_counter import add_notification
+
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+}
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 security = HTTPBearer()
 
 
-# Dependency to get current user
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    token = credentials.credentials
-    payload = verify_token(token)
+class Principal:
+    """The authenticated caller as stated by the JWT, without a database lookup"""
+    def __init__(self, id: int, email: str = None):
+        self.id = id
+        self.email = email
+
+
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = verify_token(credentials.credentials)
     
     if payload is None:
         raise HTTPException(
@@ -27,35 +39,81 @@ async def get_current_user(
             detail="Invalid authentication credentials"
         )
     
-    user_id = payload.get("user_id")
-    if user_id is None:
+    # Scoped tokens (notification stream tickets) aren't access tokens
+    if payload.get("user_id") is None or payload.get("scope") is not None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    return payload
+
+
+def _user_not_found():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found"
+    )
+
+
+# Dependency to get current user (cached, detached; read-only)
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    payload = _token_payload(credentials)
+    
+    user = get_cached_user(db, payload["user_id"])
     if user is None:
+        raise _user_not_found()
+    
+    return user
+
+
+# Dependency for endpoints that only need the caller's id
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Principal:
+    payload = _token_payload(credentials)
+    return Principal(payload["user_id"], payload.get("email"))
+
+
+# Dependency for endpoints that modify the user (attached to the request session)
+async def get_current_db_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    payload = _token_payload(credentials)
+    
+    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    if user is None:
+        raise _user_not_found()
+    
+    return user
+
+
+# Dependency for admin-only endpoints (users listed in ADMIN_EMAILS)
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if (current_user.email or "").lower() not in ADMIN_EMAILS:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
         )
     
-    return user
+    return current_user
 
 
 # Log activity helper
 def log_activity(db: Session, user_id: int, activity_type: str, details: dict, request: Request):
-    from models import ActivityLog
-    activity_log = ActivityLog(
-        user_id=user_id,
-        activity_type=activity_type,
-        details=details,
-        ip_address=request.client.host if request.client else None,
-        user_agent=request.headers.get("user-agent")
+    # Written in batches by the background activity log writer; nothing
+    # is added to the caller's session
+    enqueue_activity(
+        user_id,
+        activity_type,
+        details,
+        request.client.host if request.client else None,
+        request.headers.get("user-agent")
     )
-    db.add(activity_log)
-    db.commit()
 
 
 @router.post("/google", response_model=TokenResponse)
@@ -65,7 +123,8 @@ async def google_auth(
     db: Session = Depends(get_db)
 ):
     """Authenticate user with Google OAuth token"""
-    google_user = verify_google_token(auth_request.token)
+    # Certificate fetches block on the network; keep them off the event loop
+    google_user = await asyncio.to_thread(verify_google_token, auth_request.token)
     
     if not google_user:
         raise HTTPException(
@@ -94,8 +153,9 @@ async def google_auth(
             message="Complete your profile to get started with the hackathon.",
             type="welcome"
         )
-        db.add(notification)
+        add_notification(db, notification)
         db.commit()
+        publish_notification(notification)
     
     # Log login activity
     log_activity(db, user.id, "login", {"method": "google"}, request)
@@ -119,7 +179,7 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 async def update_profile(
     profile_data: UserProfileUpdate,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_db_user),
     db: Session = Depends(get_db)
 ):
     """Update user profile information"""
@@ -128,6 +188,7 @@ async def update_profile(
     
     db.commit()
     db.refresh(current_user)
+    invalidate_user(current_user.id)
     
     # Log profile update
     log_activity(db, current_user.id, "profile_update", profile_data.dict(exclude_unset=True), request)
@@ -0,0 +1,60 @@
+"""
+Benchmark concurrent AI evaluations against fake_llm_server.py.
+
+    FAKE_LLM_LATENCY=2.0 python fake_llm_server.py
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake python bench_ai_eval.py 32
+
+Pass "batch" as the second argument to run through batch_evaluate_codes
+(rate-limited, with retries) instead of plain concurrent calls:
+
+    python bench_ai_eval.py 200 batch
+"""
+import asyncio
+import sys
+import time
+
+from ai_evaluator import (
+    evaluate_code_with_ai, batch_evaluate_codes, close_ai_client, AI_EVAL_CONCURRENCY
+)
+
+SAMPLE_SUBMISSION = {
+    "code": "nums = list(map(int, input().split()))\ntarget = int(input())\nprint(0, 1)",
+    "language": "python",
+    "problem_description": "Return indices of the two numbers that add up to target.",
+    "sample_input": "2 7 11 15\n9",
+    "sample_output": "0 1"
+}
+
+
+def print_progress(stats: dict):
+    print(
+        f"\r{stats['completed']}/{stats['total']} done, {stats['retries']} retries, "
+        f"{stats['throughput_per_min']:.0f}/min",
+        end="", flush=True
+    )
+
+
+async def main(count: int, mode: str):
+    print(f"Evaluating {count} submissions ({mode}) with concurrency {AI_EVAL_CONCURRENCY}...")
+
+    start = time.perf_counter()
+    if mode == "batch":
+        results = await batch_evaluate_codes([SAMPLE_SUBMISSION] * count, on_progress=print_progress)
+        print()
+    else:
+        results = await asyncio.gather(*[
+            evaluate_code_with_ai(**SAMPLE_SUBMISSION) for _ in range(count)
+        ])
+    elapsed = time.perf_counter() - start
+
+    await close_ai_client()
+
+    failed = sum(1 for r in results if r.get("fallback"))
+    print(f"Done in {elapsed:.2f}s ({count / elapsed:.1f} evaluations/s), {failed} failed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        sys.argv[2] if len(sys.argv) > 2 else "concurrent"
+    ))
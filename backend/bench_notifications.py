@@ -0,0 +1,128 @@
+"""
+Load test for the notification push channel.
+
+Serves the notifications router on a local uvicorn server, opens one
+idle SSE stream per simulated user, then publishes one notification to
+every user and reports connect time, memory and delivery latency:
+
+    python bench_notifications.py 10000
+
+Client and server share this process, so it needs more than twice as
+many file descriptors as streams; the soft limit is raised to the hard
+limit where the OS allows it.
+"""
+import asyncio
+import os
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from models import Notification
+from notification_hub import (
+    start_notification_hub, stop_notification_hub, publish_notification, notification_hub_stats
+)
+from notifications_routes import router as notifications_router, stream_ticket
+
+BENCH_NOTIFY_PORT = int(os.getenv("BENCH_NOTIFY_PORT", 8003))
+BENCH_CONNECT_PARALLEL = int(os.getenv("BENCH_CONNECT_PARALLEL", 500))
+
+
+def rss_mb() -> float:
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def raise_fd_limit(streams: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, streams * 2 + 1000))
+    if wanted > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    if wanted < streams * 2 + 100:
+        print(f"⚠️  File descriptor limit {wanted} is too low for {streams} streams")
+
+
+async def main(streams: int):
+    raise_fd_limit(streams)
+
+    app = FastAPI()
+    app.include_router(notifications_router)
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=BENCH_NOTIFY_PORT,
+        backlog=streams, log_level="warning", timeout_keep_alive=3600
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    await start_notification_hub()
+
+    url = f"http://127.0.0.1:{BENCH_NOTIFY_PORT}/api/notifications/stream"
+    client = httpx.AsyncClient(
+        timeout=None,
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    )
+    connect_slots = asyncio.Semaphore(BENCH_CONNECT_PARALLEL)
+    connected = 0
+    all_connected = asyncio.Event()
+    latencies = []
+    published_at = {}
+
+    async def listen(user_id: int):
+        nonlocal connected
+        ticket = stream_ticket(user_id)
+        await connect_slots.acquire()
+        async with client.stream("GET", url, params={"ticket": ticket}) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("retry:"):
+                    # The stream is subscribed before its first line is sent
+                    connect_slots.release()
+                    connected += 1
+                    if connected == streams:
+                        all_connected.set()
+                elif line.startswith("data:"):
+                    latencies.append(time.perf_counter() - published_at[user_id])
+                    return
+
+    rss_before = rss_mb()
+    print(f"Opening {streams} idle streams...")
+    start = time.perf_counter()
+    listeners = [asyncio.create_task(listen(i)) for i in range(1, streams + 1)]
+    await all_connected.wait()
+    print(f"  connected in {time.perf_counter() - start:.2f} s, "
+          f"RSS {rss_before:.0f} -> {rss_mb():.0f} MB "
+          f"(~{(rss_mb() - rss_before) * 1024 / streams:.1f} KB per stream, client included)")
+
+    # Idle for a moment: no work should happen per connection
+    await asyncio.sleep(2)
+
+    print(f"Publishing one notification to each of {streams} users...")
+    start = time.perf_counter()
+    for user_id in range(1, streams + 1):
+        published_at[user_id] = time.perf_counter()
+        publish_notification(Notification(
+            id=user_id, user_id=user_id, title="Bench", message="Load test",
+            type="bench", is_read=False, created_at=datetime.utcnow()
+        ))
+    await asyncio.gather(*listeners)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"  all delivered in {elapsed:.2f} s")
+    print(f"  latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms")
+    print(f"  hub: {notification_hub_stats()}")
+
+    await client.aclose()
+    await stop_notification_hub()
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
@@ -0,0 +1,89 @@
+"""
+Circuit breaker for outbound calls to a flaky dependency.
+
+After `failure_threshold` consecutive failures the breaker opens and
+callers are rejected immediately for `cooldown` seconds. It then goes
+half-open: exactly one call is let through as a trial (everyone else is
+still rejected), and its outcome closes the breaker again or re-opens
+it for another cooldown.
+"""
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "rejected": 0,
+            "times_opened": 0,
+            "failed_call_seconds": 0.0
+        }
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a trial call through"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def is_open(self) -> bool:
+        """Whether a call made now would be rejected"""
+        if self.state == "open" and self.retry_after() == 0:
+            self.state = "half_open"
+        return self.state == "open" or (self.state == "half_open" and self._trial_in_flight)
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls are currently blocked"""
+        if self.is_open():
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(self.name, self.retry_after())
+        if self.state == "half_open":
+            self._trial_in_flight = True
+        self._stats["calls"] += 1
+
+    def release_trial(self):
+        """Free the half-open trial slot of a call that ended without an outcome (e.g. cancelled)"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, duration: float):
+        self._trial_in_flight = False
+        self.consecutive_failures += 1
+        self._stats["failures"] += 1
+        self._stats["failed_call_seconds"] += duration
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self._stats["times_opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        failures = self._stats["failures"]
+        return {
+            "name": self.name,
+            "state": "open" if self.is_open() and self.state == "open" else self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(self.retry_after(), 1),
+            **self._stats,
+            "failed_call_seconds": round(self._stats["failed_call_seconds"], 2),
+            "avg_failed_call_seconds": round(self._stats["failed_call_seconds"] / failures, 2) if failures else 0.0
+        }
@@ -0,0 +1,316 @@
+"""
+Execution judge: runs submissions against a problem's stored test cases.
+
+Every test case runs in its own subprocess, in a scratch directory, with
+CPU time, address space and output size capped from the problem's
+time_limit (seconds) and memory_limit (MB). C++ and Java are compiled
+once per submission; Python runs on pre-spawned interpreters that sit
+idle on stdin until they are handed a program, so interpreter start-up
+is off the critical path. Each warm interpreter runs exactly one test
+and is then discarded.
+
+These are resource limits, not a security sandbox: run the API as an
+unprivileged user (or in a container) when judging untrusted code.
+"""
+import asyncio
+import json
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: run without rlimits
+    resource = None
+
+JUDGE_WARM_WORKERS = int(os.getenv("JUDGE_WARM_WORKERS", 4))
+JUDGE_MAX_PARALLEL = int(os.getenv("JUDGE_MAX_PARALLEL", os.cpu_count() or 2))
+DEFAULT_TIME_LIMIT = float(os.getenv("JUDGE_DEFAULT_TIME_LIMIT", 2))  # seconds
+DEFAULT_MEMORY_LIMIT = int(os.getenv("JUDGE_DEFAULT_MEMORY_LIMIT", 256))  # MB
+COMPILE_TIMEOUT = 15
+MAX_OUTPUT_BYTES = 1024 * 1024
+
+# Reads a JSON header line, applies the limits to itself, then runs the
+# program that follows; the rest of stdin is the test input.
+_PYTHON_BOOTSTRAP = """
+import json, sys, resource
+header = json.loads(sys.stdin.buffer.readline())
+memory = header["memory_mb"] * 1024 * 1024
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_CPU, (header["cpu_seconds"], header["cpu_seconds"] + 1))
+source = sys.stdin.buffer.read(header["code_bytes"])
+del json, resource, header, memory
+exec(compile(source, "main.py", "exec"), {"__name__": "__main__"})
+"""
+
+_parallel = asyncio.Semaphore(JUDGE_MAX_PARALLEL)
+_warm_python = None
+
+
+def supported_language(language: str) -> bool:
+    """Whether this host has a toolchain for the language"""
+    tools = {
+        "python": [sys.executable],
+        "javascript": ["node"],
+        "cpp": ["g++"],
+        "java": ["javac", "java"],
+    }.get(language.lower())
+    return bool(tools) and all(shutil.which(tool) for tool in tools)
+
+
+def _limits(cpu_seconds: int, memory_mb: int = None):
+    """preexec_fn applying rlimits in the child before exec"""
+    def apply():
+        os.setsid()
+        if resource is None:
+            return
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (MAX_OUTPUT_BYTES, MAX_OUTPUT_BYTES))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if memory_mb:
+            memory = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    return apply
+
+
+def _kill(proc):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+# ============== WARM PYTHON POOL ==============
+
+class _WarmPythonPool:
+    """Idle interpreters, each waiting for one program on stdin"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._refills = set()
+
+    async def _spawn(self):
+        workdir = tempfile.mkdtemp(prefix="judge-py-")
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", "-S", "-c", _PYTHON_BOOTSTRAP,
+            cwd=workdir,
+            env={"PATH": os.environ.get("PATH", "/usr/bin:/bin")},
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            preexec_fn=_limits(cpu_seconds=600)
+        )
+        return proc, workdir
+
+    async def fill(self):
+        while self._idle.qsize() < self.size:
+            self._idle.put_nowait(await self._spawn())
+
+    async def acquire(self):
+        """Take a warm interpreter and start replacing it in the background"""
+        task = asyncio.create_task(self._refill_one())
+        self._refills.add(task)
+        task.add_done_callback(self._refills.discard)
+        if self._idle.empty():
+            return await self._spawn()
+        return self._idle.get_nowait()
+
+    async def _refill_one(self):
+        if self._idle.qsize() < self.size:
+            self._idle.put_nowait(await self._spawn())
+
+    async def close(self):
+        for task in list(self._refills):
+            task.cancel()
+        while not self._idle.empty():
+            proc, workdir = self._idle.get_nowait()
+            _kill(proc)
+            await proc.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def start_judge_pool():
+    """Pre-spawn warm interpreters so the first submissions don't pay for it"""
+    global _warm_python
+    _warm_python = _WarmPythonPool(JUDGE_WARM_WORKERS)
+    await _warm_python.fill()
+
+
+async def stop_judge_pool():
+    if _warm_python:
+        await _warm_python.close()
+
+
+# ============== RUNNING TESTS ==============
+
+CHECKERS = ("exact", "unordered")
+
+
+def _outputs_match(actual: str, expected: str, checker: str = "exact") -> bool:
+    """Compare with the problem's checker.
+
+    exact: line by line, ignoring trailing whitespace and trailing blank lines
+    unordered: the same whitespace-separated tokens in any order
+    """
+    if checker == "unordered":
+        return sorted((actual or "").split()) == sorted((expected or "").split())
+    def normalize(text):
+        return [line.rstrip() for line in (text or "").rstrip().splitlines()]
+    return normalize(actual) == normalize(expected)
+
+
+async def _communicate(proc, stdin: bytes, time_limit: float):
+    """Feed stdin and wait; returns (stdout, stderr, timed_out, elapsed_ms)"""
+    start = time.perf_counter()
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate(stdin), timeout=time_limit + 0.5
+        )
+        timed_out = False
+    except asyncio.TimeoutError:
+        _kill(proc)
+        stdout, stderr = await proc.communicate()
+        timed_out = True
+    return stdout, stderr, timed_out, int((time.perf_counter() - start) * 1000)
+
+
+def _verdict(proc, stdout: bytes, stderr: bytes, timed_out: bool, expected: str, checker: str) -> str:
+    if timed_out or proc.returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        return "time_limit_exceeded"
+    if b"MemoryError" in stderr or b"std::bad_alloc" in stderr or b"OutOfMemoryError" in stderr:
+        return "memory_limit_exceeded"
+    if proc.returncode != 0:
+        return "runtime_error"
+    if _outputs_match(stdout.decode("utf-8", "replace"), expected, checker):
+        return "accepted"
+    return "wrong_answer"
+
+
+async def _run_python(code: str, stdin: str, time_limit: float, memory_mb: int):
+    proc, workdir = await _warm_python.acquire() if _warm_python else await _WarmPythonPool(0)._spawn()
+    try:
+        source = code.encode()
+        header = json.dumps({
+            "memory_mb": memory_mb,
+            "cpu_seconds": max(1, int(time_limit + 0.999)),
+            "code_bytes": len(source)
+        }).encode() + b"\n"
+        return proc, await _communicate(proc, header + source + stdin.encode(), time_limit)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def _run_command(command: list, workdir: str, stdin: str, time_limit: float, memory_mb: int = None):
+    proc = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=workdir,
+        env={"PATH": os.environ.get("PATH", "/usr/bin:/bin"), "HOME": workdir},
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        preexec_fn=_limits(max(1, int(time_limit + 0.999)), memory_mb)
+    )
+    return proc, await _communicate(proc, stdin.encode(), time_limit)
+
+
+async def _compile(language: str, code: str, workdir: str, memory_mb: int):
+    """Write the source and compile it; returns (run command, compile error)"""
+    if language == "cpp":
+        with open(os.path.join(workdir, "main.cpp"), "w") as f:
+            f.write(code)
+        command = ["g++", "-O2", "-std=c++17", "-o", "main", "main.cpp"]
+        run = ["./main"]
+    elif language == "java":
+        match = re.search(r"public\s+(?:final\s+)?class\s+(\w+)", code)
+        class_name = match.group(1) if match else "Solution"
+        with open(os.path.join(workdir, f"{class_name}.java"), "w") as f:
+            f.write(code)
+        command = ["javac", f"{class_name}.java"]
+        # The JVM reserves far more address space than it uses, so memory
+        # is capped through the heap size rather than RLIMIT_AS.
+        run = ["java", f"-Xmx{memory_mb}m", "-Xss64m", "-cp", ".", class_name]
+    else:
+        with open(os.path.join(workdir, "main.js"), "w") as f:
+            f.write(code)
+        return ["node", f"--max-old-space-size={memory_mb}", "main.js"], None
+
+    proc, (stdout, stderr, timed_out, _) = await _run_command(
+        command, workdir, "", COMPILE_TIMEOUT
+    )
+    if timed_out or proc.returncode != 0:
+        return None, (stderr or stdout).decode("utf-8", "replace")[-2000:] or "Compilation timed out"
+    return run, None
+
+
+async def _run_test(language: str, code: str, run: list, workdir: str, test_case, time_limit: float, memory_mb: int, checker: str):
+    async with _parallel:
+        if language == "python":
+            proc, (stdout, stderr, timed_out, elapsed) = await _run_python(
+                code, test_case.input_data, time_limit, memory_mb
+            )
+        else:
+            # Native binaries get RLIMIT_AS; the JVM and V8 are capped by flags
+            proc, (stdout, stderr, timed_out, elapsed) = await _run_command(
+                run, workdir, test_case.input_data, time_limit,
+                memory_mb if language == "cpp" else None
+            )
+    return {
+        "test_case_id": test_case.id,
+        "verdict": _verdict(proc, stdout, stderr, timed_out, test_case.expected_output, checker),
+        "time_ms": elapsed
+    }
+
+
+async def judge_submission(code: str, language: str, test_cases: list, time_limit=None, memory_limit=None, checker=None) -> dict:
+    """
+    Run a submission against test cases, comparing output with `checker`
+    (one of CHECKERS; exact by default).
+    Returns passed/total counts, a status compatible with attempt.status
+    and per-test verdicts (inputs and outputs are not exposed).
+    """
+    language = language.lower()
+    time_limit = float(time_limit or DEFAULT_TIME_LIMIT)
+    memory_mb = int(memory_limit or DEFAULT_MEMORY_LIMIT)
+    checker = checker if checker in CHECKERS else "exact"
+
+    workdir = tempfile.mkdtemp(prefix="judge-")
+    try:
+        run, compile_error = None, None
+        if language != "python":
+            run, compile_error = await _compile(language, code, workdir, memory_mb)
+        if compile_error:
+            return {
+                "passed": 0,
+                "total": len(test_cases),
+                "status": "failed",
+                "compile_error": compile_error,
+                "results": []
+            }
+
+        results = await asyncio.gather(*[
+            _run_test(language, code, run, workdir, test_case, time_limit, memory_mb, checker)
+            for test_case in test_cases
+        ])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    passed = sum(1 for r in results if r["verdict"] == "accepted")
+    if passed == len(results):
+        status = "passed"
+    elif passed:
+        status = "partial"
+    else:
+        status = "failed"
+
+    return {
+        "passed": passed,
+        "total": len(results),
+        "status": status,
+        "compile_error": None,
+        "results": results
+    }
@@ -0,0 +1,144 @@
+"""
+Contest phase schedule.
+
+Each stage is open during one or more windows, stored in the
+contest_phases table or, while that table is empty, taken from
+CONTEST_SCHEDULE_FILE (a JSON list shaped like DEFAULT_PHASES) or the
+defaults below. load_contest_schedule() precomputes every window
+boundary into a sorted timeline holding the phase of each stage between
+consecutive boundaries, so a lookup is one bisect and nothing is parsed
+per request.
+
+Outside its windows a stage is "coming-soon" until its first window
+opens and "ended" afterwards. Times are naive local time, like
+datetime.now().
+"""
+import bisect
+import json
+import os
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ContestPhase
+
+CONTEST_SCHEDULE_FILE = os.getenv("CONTEST_SCHEDULE_FILE", "")
+CONTEST_ENFORCE_SCHEDULE = os.getenv("CONTEST_ENFORCE_SCHEDULE", "1") == "1"
+
+STAGE_NAMES = {"stage1": "Stage 1", "stage2": "Stage 2"}
+OPEN_PHASES = ("open", "reopened")
+
+DEFAULT_PHASES = [
+    {"stage": "stage1", "phase": "open", "starts_at": None, "ends_at": "2026-02-09T00:00:00"},
+    {"stage": "stage1", "phase": "reopened", "starts_at": "2026-02-14T10:00:00", "ends_at": "2026-02-14T15:00:00"},
+    {"stage": "stage2", "phase": "open", "starts_at": "2026-02-08T00:00:00", "ends_at": "2026-02-13T00:00:00"}
+]
+
+
+class Timeline:
+    def __init__(self, windows: list):
+        """windows: (stage, phase, starts_at or None, ends_at or None)"""
+        self.windows = windows
+        self.boundaries = sorted({t for w in windows for t in w[2:] if t is not None})
+        # segments[i] holds every stage's phase from boundaries[i - 1] up to boundaries[i]
+        starts = [datetime.min] + self.boundaries
+        self.segments = [
+            {stage: self._phase_at(stage, start) for stage in STAGE_NAMES}
+            for start in starts
+        ]
+
+    def _phase_at(self, stage: str, t: datetime) -> str:
+        stage_windows = [w for w in self.windows if w[0] == stage]
+        for _, phase, start, end in stage_windows:
+            if (start is None or start <= t) and (end is None or t < end):
+                return phase
+        first_start = min((w[2] or datetime.min for w in stage_windows), default=datetime.min)
+        return "coming-soon" if t < first_start else "ended"
+
+    def phases(self, now: datetime) -> dict:
+        return self.segments[bisect.bisect_right(self.boundaries, now)]
+
+    def next_transition(self, now: datetime):
+        i = bisect.bisect_right(self.boundaries, now)
+        return self.boundaries[i] if i < len(self.boundaries) else None
+
+    def deadline(self, stage: str):
+        """When the stage's last window closes (None if it never does)"""
+        ends = [w[3] for w in self.windows if w[0] == stage]
+        return None if not ends or None in ends else max(ends)
+
+
+def _parse(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _config_windows() -> list:
+    phases = DEFAULT_PHASES
+    if CONTEST_SCHEDULE_FILE:
+        with open(CONTEST_SCHEDULE_FILE, encoding="utf-8") as f:
+            phases = json.load(f)
+    return [
+        (p["stage"], p["phase"], _parse(p.get("starts_at")), _parse(p.get("ends_at")))
+        for p in phases
+    ]
+
+
+_timeline = Timeline(_config_windows())
+
+
+def load_contest_schedule(db: Session = None) -> int:
+    """(Re)build the timeline from contest_phases, or from config if the table is empty"""
+    global _timeline
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        windows = [
+            (p.stage, p.phase, p.starts_at, p.ends_at)
+            for p in db.query(ContestPhase).all()
+        ]
+    finally:
+        if own_session:
+            db.close()
+
+    # Swap in the whole timeline so concurrent readers never see a partial one
+    _timeline = Timeline(windows or _config_windows())
+    return len(_timeline.boundaries)
+
+
+def stage_phase(stage: str, now: datetime = None) -> str:
+    return _timeline.phases(now or datetime.now())[stage]
+
+
+def next_transition(now: datetime = None):
+    """The first scheduled time after now at which any phase changes (None if past all)"""
+    return _timeline.next_transition(now or datetime.now())
+
+
+def stage_deadline(stage: str):
+    return _timeline.deadline(stage)
+
+
+def require_stage_open(stage: str):
+    """Dependency that rejects requests while the stage isn't open"""
+    def check_stage_open():
+        if not CONTEST_ENFORCE_SCHEDULE:
+            return
+        phase = stage_phase(stage)
+        if phase not in OPEN_PHASES:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"{STAGE_NAMES[stage]} is {phase.replace('-', ' ')}."
+            )
+    return check_stage_open
+
+
+def contest_schedule_info(now: datetime = None) -> dict:
+    now = now or datetime.now()
+    transition = _timeline.next_transition(now)
+    return {
+        "phases": _timeline.phases(now),
+        "next_transition": transition.isoformat() if transition else None,
+        "boundaries": len(_timeline.boundaries)
+    }
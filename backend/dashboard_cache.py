@@ -0,0 +1,97 @@
+"""
+Per-process cache of dashboard payloads.
+
+GET /api/dashboard builds its whole payload from one joined query and
+keeps it here, keyed by user id. An entry lives for DASHBOARD_CACHE_TTL
+seconds (so ranks, which move with other people's results, stay fresh)
+and never past the next contest phase transition.
+
+Entries are dropped after a commit that touched the user's row, Stage 1
+result, Stage 2 project or notifications: ORM changes are picked up by
+the session hooks below, and code that changes those tables with bulk
+UPDATEs calls invalidate_dashboard_on_commit() / invalidate_all_dashboards().
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from contest_schedule import next_transition
+from models import User, Stage1Result, Stage2Project, Notification
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 10000))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", 15))
+
+_payloads = OrderedDict()  # user id -> (expires at, DashboardResponse)
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+_TRACKED = (Stage1Result, Stage2Project, Notification)
+
+
+def get_cached_dashboard(user_id: int):
+    entry = _payloads.get(user_id)
+    if entry and time.monotonic() < entry[0]:
+        _payloads.move_to_end(user_id)
+        _stats["hits"] += 1
+        return entry[1]
+    _stats["misses"] += 1
+    return None
+
+
+def cache_dashboard(user_id: int, payload):
+    ttl = DASHBOARD_CACHE_TTL
+    now = datetime.now()
+    transition = next_transition(now)
+    if transition is not None:
+        ttl = min(ttl, (transition - now).total_seconds())
+    _payloads[user_id] = (time.monotonic() + ttl, payload)
+    _payloads.move_to_end(user_id)
+    while len(_payloads) > DASHBOARD_CACHE_SIZE:
+        _payloads.popitem(last=False)
+
+
+def invalidate_dashboard(user_id: int):
+    if _payloads.pop(user_id, None):
+        _stats["invalidations"] += 1
+
+
+def invalidate_all_dashboards():
+    _stats["invalidations"] += len(_payloads)
+    _payloads.clear()
+
+
+def invalidate_dashboard_on_commit(db: Session, user_id: int):
+    """Drop the user's dashboard once this session's transaction commits"""
+    db.info.setdefault("dashboard_users", set()).add(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            invalidate_dashboard_on_commit(session, obj.id)
+        elif isinstance(obj, _TRACKED):
+            invalidate_dashboard_on_commit(session, obj.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for user_id in session.info.pop("dashboard_users", ()):
+        invalidate_dashboard(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("dashboard_users", None)
+
+
+def dashboard_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "entries": len(_payloads),
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0
+    }
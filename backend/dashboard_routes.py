@@ -1,43 +1,49 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
 
 from database import get_db
-from models import User, Stage1Result, Stage2Project, Notification
-from schemas import DashboardResponse, UserResponse
-from auth_routes import get_current_user
-from datetime import date
+from models import User, Stage1Result, Stage2Project
+from schemas import DashboardResponse, UserResponse, Stage1ResultResponse
+from auth_routes import Principal, get_current_principal
+from contest_schedule import stage_phase
+from dashboard_cache import get_cached_dashboard, cache_dashboard
+from datetime import datetime
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
-@router.get("", response_model=DashboardResponse)
-async def get_dashboard(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get user dashboard with stage status and results"""
+def _load_dashboard_row(db: Session, user_id: int):
+    """User, Stage 1 result, Stage 2 project and live rank in one query"""
+    higher = aliased(Stage1Result)
+    rank = select(func.count(higher.id) + 1).where(
+        higher.completed_at.isnot(None),
+        higher.total_score > Stage1Result.total_score
+    ).correlate(Stage1Result).scalar_subquery()
     
-    # Get Stage 1 result
-    stage1_result = db.query(Stage1Result).filter(
-        Stage1Result.user_id == current_user.id
-    ).first()
-    
-    stage1_status = "live"
-    if stage1_result and stage1_result.completed_at:
-        stage1_status = "completed"
-    if date.today() > date.fromisoformat('2026-02-08'):
-        stage1_status = "ended"
+    return db.query(User, Stage1Result, Stage2Project, rank.label("rank")).outerjoin(
+        Stage1Result, Stage1Result.user_id == User.id
+    ).outerjoin(
+        Stage2Project, Stage2Project.user_id == User.id
+    ).filter(User.id == user_id).first()
+
+
+def _build_dashboard(db: Session, user_id: int) -> DashboardResponse:
+    row = _load_dashboard_row(db, user_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    user, stage1_result, stage2_project, rank = row
     now = datetime.now()
-    special_start = datetime(2026, 2, 14, 10, 0, 0)
-    special_end = datetime(2026, 2, 14, 15, 0, 0)
-    
-    if special_start <= now <= special_end:
-        stage1_status = "live" 
     
-    # Get Stage 2 project
-    stage2_project = db.query(Stage2Project).filter(
-        Stage2Project.user_id == current_user.id
-    ).first()
+    stage1_status = "completed" if stage1_result and stage1_result.completed_at else "live"
+    phase = stage_phase("stage1", now)
+    if phase == "ended":
+        stage1_status = "ended"
+    elif phase == "reopened":
+        stage1_status = "live"
     
     stage2_status = "locked"
     if stage1_result and stage1_result.is_qualified:
@@ -45,22 +51,34 @@ async def get_dashboard(
             stage2_status = "submitted"
         else:
             stage2_status = "available"
-    if date.today() < date.fromisoformat('2026-02-08'):
-        stage2_status = "coming-soon"
-    if date.today() > date.fromisoformat('2026-02-12'):
-        stage2_status = "ended"
-   
-    # Get unread notifications count
-    notifications_count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).count()
+    phase = stage_phase("stage2", now)
+    if phase != "open":
+        stage2_status = phase
+    
+    stage1_response = None
+    if stage1_result:
+        stage1_response = Stage1ResultResponse.from_orm(stage1_result)
+        stage1_response.rank = rank if stage1_result.completed_at else None
     
     return DashboardResponse(
-        user=UserResponse.from_orm(current_user),
+        user=UserResponse.from_orm(user),
         stage1_status=stage1_status,
-        stage1_result=stage1_result,
+        stage1_result=stage1_response,
         stage2_status=stage2_status,
         stage2_project=stage2_project,
-        notifications_count=notifications_count
+        notifications_count=user.unread_notifications
     )
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Get user dashboard with stage status and results"""
+    dashboard = get_cached_dashboard(current_user.id)
+    if dashboard is None:
+        dashboard = _build_dashboard(db, current_user.id)
+        cache_dashboard(current_user.id, dashboard)
+    
+    return dashboard
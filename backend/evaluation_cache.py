@@ -0,0 +1,155 @@
+"""
+Content-addressed cache of AI evaluations.
+
+Submissions are keyed by sha256(problem id, language, normalized code),
+where normalization drops comments, blank lines and insignificant
+whitespace. Lookups go through an in-memory LRU first, then the
+evaluation_cache table. Each entry records a fingerprint of the problem
+statement it was graded against, so editing a problem invalidates its
+entries automatically.
+"""
+import hashlib
+import io
+import os
+import re
+import tokenize
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+from models import EvaluationCache, ProgrammingProblem
+
+EVAL_CACHE_SIZE = int(os.getenv("EVAL_CACHE_SIZE", 5000))
+
+_memory = OrderedDict()  # cache_key -> (problem_id, problem_hash, evaluation)
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stale": 0, "stores": 0}
+
+# String literals are matched first and kept verbatim, so only comments
+# and whitespace outside literals collapse to a single space.
+_C_LIKE_TOKENS = re.compile(
+    r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`)'''
+    r'''|((?:\s|//[^\n]*|/\*.*?\*/)+)''',
+    re.S
+)
+
+
+def _normalize_python(code: str) -> str:
+    lines = code.splitlines()
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT:
+                row, col = tok.start
+                lines[row - 1] = lines[row - 1][:col]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Unparseable code is still cacheable; just drop whole-line comments
+        lines = [line for line in lines if not line.lstrip().startswith("#")]
+    lines = [line.rstrip() for line in lines]
+    return "\n".join(line for line in lines if line)
+
+
+def _normalize_c_like(code: str) -> str:
+    return _C_LIKE_TOKENS.sub(lambda m: m.group(1) or " ", code).strip()
+
+
+def normalize_code(code: str, language: str) -> str:
+    """Strip comments and insignificant whitespace from a submission"""
+    if language.lower() == "python":
+        return _normalize_python(code)
+    return _normalize_c_like(code)
+
+
+def problem_fingerprint(problem: ProgrammingProblem) -> str:
+    """Hash of everything about a problem that the evaluator sees"""
+    parts = [
+        problem.description, problem.sample_input,
+        problem.sample_output, problem.constraints
+    ]
+    return hashlib.sha256("\x1f".join(p or "" for p in parts).encode()).hexdigest()
+
+
+def cache_key(problem_id: int, language: str, code: str) -> str:
+    normalized = normalize_code(code, language)
+    return hashlib.sha256(f"{problem_id}\x1f{language.lower()}\x1f{normalized}".encode()).hexdigest()
+
+
+def _remember(key: str, problem_id: int, problem_hash: str, evaluation: dict):
+    _memory[key] = (problem_id, problem_hash, evaluation)
+    _memory.move_to_end(key)
+    while len(_memory) > EVAL_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def get_cached_evaluation(db: Session, problem: ProgrammingProblem, language: str, code: str):
+    """Return a cached evaluation for this submission, or None"""
+    key = cache_key(problem.id, language, code)
+    problem_hash = problem_fingerprint(problem)
+
+    cached = _memory.get(key)
+    if cached:
+        if cached[1] == problem_hash:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return {**cached[2], "cached": True}
+        del _memory[key]
+        _stats["stale"] += 1
+
+    entry = db.query(EvaluationCache).filter(EvaluationCache.cache_key == key).first()
+    if entry:
+        if entry.problem_hash == problem_hash:
+            entry.hit_count += 1
+            db.commit()
+            _remember(key, problem.id, problem_hash, entry.result)
+            _stats["db_hits"] += 1
+            return {**entry.result, "cached": True}
+        db.delete(entry)
+        db.commit()
+        _stats["stale"] += 1
+
+    _stats["misses"] += 1
+    return None
+
+
+def store_evaluation(db: Session, problem: ProgrammingProblem, language: str, code: str, evaluation: dict):
+    """Cache a successful evaluation in memory and in the database"""
+    if evaluation.get("fallback"):
+        return
+
+    key = cache_key(problem.id, language, code)
+    problem_hash = problem_fingerprint(problem)
+    _remember(key, problem.id, problem_hash, dict(evaluation))
+
+    db.add(EvaluationCache(
+        cache_key=key,
+        problem_id=problem.id,
+        problem_hash=problem_hash,
+        language=language,
+        result=evaluation
+    ))
+    try:
+        db.commit()
+        _stats["stores"] += 1
+    except IntegrityError:
+        # Another worker cached the same submission first
+        db.rollback()
+
+
+def invalidate_problem(db: Session, problem_id: int):
+    """Drop every cached evaluation for a problem"""
+    for key in [k for k, v in _memory.items() if v[0] == problem_id]:
+        del _memory[key]
+
+    db.query(EvaluationCache).filter(
+        EvaluationCache.problem_id == problem_id
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def cache_stats() -> dict:
+    lookups = _stats["memory_hits"] + _stats["db_hits"] + _stats["misses"]
+    hits = _stats["memory_hits"] + _stats["db_hits"]
+    return {
+        **_stats,
+        "memory_entries": len(_memory),
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+    }
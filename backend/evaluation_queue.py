@@ -0,0 +1,387 @@
+"""
+Background evaluation of programming submissions.
+
+submit_code stores the attempt as 'queued' and returns immediately; a
+pool of worker tasks picks attempt ids off an in-process queue, grades
+the code and writes the result back. Every worker process runs this
+pool, so an attempt is claimed with a conditional UPDATE ('queued' ->
+'running') and skipped by whoever loses the claim. Workers are
+coroutines, but every database call they make runs in a thread
+(asyncio.to_thread) so the event loop keeps serving requests. Attempts whose state
+hasn't changed for EVAL_LEASE_SECONDS (left behind by a process that
+died) are re-queued at startup and then every lease period.
+
+Problems with stored test cases are scored by the execution judge and
+the LLM only contributes feedback; other problems are scored by the LLM.
+
+While the AI circuit breaker is open, LLM-scored attempts are parked on
+a re-evaluation list (still 'queued' in the database). Judge-scored
+attempts are still scored: their result is recorded as
+'feedback_pending' and only the LLM review is parked. Parked attempts
+are re-enqueued once the breaker lets calls through again, one at a
+time while it is half-open.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import (
+    ProgrammingQuestionAttempt, ProgrammingProblem, ProgrammingTestCase, Stage1Result
+)
+from ai_evaluator import evaluate_code_with_ai, ai_breaker
+from evaluation_cache import get_cached_evaluation, store_evaluation
+from code_judge import judge_submission, supported_language
+from prescreen import prescreen_submission
+from leaderboard_cache import stage1_leaderboard
+from scoring import stage1_scores
+
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", 4))
+EVAL_LEASE_SECONDS = float(os.getenv("EVAL_LEASE_SECONDS", 600))
+
+_queue = None
+_pending = set()
+_deferred = set()
+_workers = []
+
+
+class EvaluationDeferred(Exception):
+    """The AI provider is unavailable; evaluate this attempt later"""
+
+
+def enqueue_evaluation(attempt_id: int):
+    """Schedule an attempt for evaluation (no-op if already waiting)"""
+    if attempt_id in _pending:
+        return
+    _pending.add(attempt_id)
+    _queue.put_nowait(attempt_id)
+
+
+async def start_evaluation_workers():
+    """Create the queue, recover unfinished attempts and start workers"""
+    global _queue
+    _queue = asyncio.Queue()
+
+    for attempt_id in await asyncio.to_thread(_recover_unfinished_attempts):
+        enqueue_evaluation(attempt_id)
+
+    for n in range(EVAL_WORKERS):
+        _workers.append(asyncio.create_task(_worker(n)))
+    _workers.append(asyncio.create_task(_reevaluation_loop()))
+    _workers.append(asyncio.create_task(_recovery_loop()))
+
+
+async def stop_evaluation_workers():
+    """Cancel worker tasks; unfinished attempts stay queued in the database"""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def _recover_unfinished_attempts() -> list:
+    """Re-queue attempts whose lease expired and return the stale queued ids"""
+    cutoff = datetime.utcnow() - timedelta(seconds=EVAL_LEASE_SECONDS)
+    db = SessionLocal()
+    try:
+        db.query(ProgrammingQuestionAttempt).filter(
+            ProgrammingQuestionAttempt.evaluation_state == 'running',
+            ProgrammingQuestionAttempt.updated_at < cutoff
+        ).update(
+            {"evaluation_state": "queued", "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+
+        # Recently queued attempts belong to a live worker's in-memory queue
+        rows = db.query(ProgrammingQuestionAttempt.id).filter(
+            ProgrammingQuestionAttempt.evaluation_state.in_(['queued', 'feedback_pending']),
+            ProgrammingQuestionAttempt.updated_at < cutoff
+        ).order_by(ProgrammingQuestionAttempt.updated_at).all()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+async def _recovery_loop():
+    while True:
+        await asyncio.sleep(EVAL_LEASE_SECONDS)
+        try:
+            attempt_ids = await asyncio.to_thread(_recover_unfinished_attempts)
+        except Exception as e:
+            print(f"Evaluation recovery failed: {e}")
+            continue
+        for attempt_id in attempt_ids:
+            enqueue_evaluation(attempt_id)
+
+
+def _claim_attempt(db, attempt_id: int) -> bool:
+    """Atomically move a queued attempt to 'running'; False if someone else has it"""
+    claimed = db.query(ProgrammingQuestionAttempt).filter(
+        ProgrammingQuestionAttempt.id == attempt_id,
+        ProgrammingQuestionAttempt.evaluation_state == 'queued'
+    ).update(
+        {"evaluation_state": "running", "updated_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.commit()
+    return claimed == 1
+
+
+async def _worker(n: int):
+    while True:
+        attempt_id = await _queue.get()
+        _pending.discard(attempt_id)
+        try:
+            await _evaluate_attempt(attempt_id)
+        except EvaluationDeferred:
+            await asyncio.to_thread(_defer, attempt_id)
+        except Exception as e:
+            print(f"Evaluation worker {n} failed on attempt {attempt_id}: {e}")
+            await asyncio.to_thread(_mark_failed, attempt_id)
+        finally:
+            _queue.task_done()
+
+
+def _defer(attempt_id: int):
+    """Put an attempt back to 'queued' and park it until the breaker closes"""
+    db = SessionLocal()
+    try:
+        db.query(ProgrammingQuestionAttempt).filter(
+            ProgrammingQuestionAttempt.id == attempt_id,
+            ProgrammingQuestionAttempt.evaluation_state == 'running'
+        ).update(
+            {"evaluation_state": "queued", "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    _deferred.add(attempt_id)
+
+
+async def _reevaluation_loop():
+    while True:
+        await asyncio.sleep(max(ai_breaker.retry_after(), 1.0))
+        if not _deferred or ai_breaker.is_open():
+            continue
+        # Half-open lets a single trial call through; the rest wait for it to close
+        batch = list(_deferred) if ai_breaker.state == "closed" else [next(iter(_deferred))]
+        for attempt_id in batch:
+            _deferred.discard(attempt_id)
+            enqueue_evaluation(attempt_id)
+
+
+def queue_stats() -> dict:
+    return {
+        "queued": _queue.qsize() if _queue else 0,
+        "deferred": len(_deferred),
+        "workers": EVAL_WORKERS
+    }
+
+
+def _load_attempt(db, attempt_id: int):
+    """(attempt, problem, claimed) for an attempt to work on, or None.
+
+    Queued attempts are claimed; claimed is False for a scored attempt
+    that only needs its LLM review.
+    """
+    attempt = db.query(ProgrammingQuestionAttempt).filter(
+        ProgrammingQuestionAttempt.id == attempt_id
+    ).first()
+    if not attempt:
+        return None
+    if attempt.evaluation_state == 'feedback_pending':
+        return attempt, _get_problem(db, attempt.problem_id), False
+    if attempt.evaluation_state != 'queued':
+        return None
+
+    if not _claim_attempt(db, attempt_id):
+        return None
+    db.refresh(attempt)
+    return attempt, _get_problem(db, attempt.problem_id), True
+
+
+def _get_problem(db, problem_id: int) -> ProgrammingProblem:
+    return db.query(ProgrammingProblem).filter(
+        ProgrammingProblem.id == problem_id
+    ).first()
+
+
+def _save_evaluation(db, attempt: ProgrammingQuestionAttempt, code: str, language: str, evaluation: dict) -> bool:
+    """Write the result back; False if the attempt was re-submitted meanwhile"""
+    db.refresh(attempt)
+    if attempt.code != code or attempt.language != language:
+        # Re-submitted while we were evaluating; the newer submission
+        # has already been queued and will overwrite this result.
+        return False
+
+    attempt.status = evaluation['status']
+    attempt.score = evaluation['score']
+    attempt.ai_feedback = evaluation['feedback']
+    # Only tokens actually spent on this evaluation; cache hits cost nothing
+    usage = evaluation.get('usage') if not evaluation.get('cached') else None
+    attempt.prompt_tokens = usage['prompt_tokens'] if usage else 0
+    attempt.completion_tokens = usage['completion_tokens'] if usage else 0
+    attempt.evaluation_state = 'feedback_pending' if evaluation.get('feedback_pending') else 'done'
+    attempt.updated_at = datetime.utcnow()
+    db.commit()
+
+    _refresh_completed_result(db, attempt.user_id)
+    return True
+
+
+async def _evaluate_attempt(attempt_id: int):
+    # Loaded objects stay readable after a commit, so nothing is lazily
+    # re-fetched on the event loop between the threaded database calls
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        loaded = await asyncio.to_thread(_load_attempt, db, attempt_id)
+        if not loaded:
+            return
+        attempt, problem, claimed = loaded
+        if not claimed:
+            await _add_review_feedback(db, attempt, problem)
+            return
+
+        code, language = attempt.code, attempt.language
+
+        evaluation = await _evaluate_submission(db, problem, language, code)
+
+        saved = await asyncio.to_thread(_save_evaluation, db, attempt, code, language, evaluation)
+        if saved and evaluation.get('feedback_pending'):
+            _deferred.add(attempt_id)
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+async def _add_review_feedback(db, attempt: ProgrammingQuestionAttempt, problem: ProgrammingProblem):
+    """Append the LLM review to a judge score recorded while the AI was unavailable"""
+    code = attempt.code
+    review = await _ai_evaluation(db, problem, attempt.language, code)
+    await asyncio.to_thread(_save_review_feedback, db, attempt, code, review)
+
+
+def _save_review_feedback(db, attempt: ProgrammingQuestionAttempt, code: str, review: dict):
+    usage = review.get('usage') if not review.get('cached') else None
+    # Skipped if the attempt was re-submitted (and re-queued) meanwhile
+    db.query(ProgrammingQuestionAttempt).filter(
+        ProgrammingQuestionAttempt.id == attempt.id,
+        ProgrammingQuestionAttempt.evaluation_state == 'feedback_pending',
+        ProgrammingQuestionAttempt.code == code
+    ).update({
+        "ai_feedback": f"{attempt.ai_feedback} {review['feedback']}",
+        "prompt_tokens": usage['prompt_tokens'] if usage else 0,
+        "completion_tokens": usage['completion_tokens'] if usage else 0,
+        "evaluation_state": "done",
+        "updated_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+
+
+def _test_cases(db, problem_id: int) -> list:
+    return db.query(ProgrammingTestCase).filter(
+        ProgrammingTestCase.problem_id == problem_id
+    ).order_by(ProgrammingTestCase.id).all()
+
+
+async def _ai_evaluation(db, problem: ProgrammingProblem, language: str, code: str) -> dict:
+    evaluation = await asyncio.to_thread(get_cached_evaluation, db, problem, language, code)
+    if evaluation is None:
+        evaluation = await evaluate_code_with_ai(
+            code=code,
+            language=language,
+            problem_description=problem.description,
+            sample_input=problem.sample_input,
+            sample_output=problem.sample_output,
+            constraints=problem.constraints
+        )
+        if evaluation.get("retryable"):
+            raise EvaluationDeferred()
+        await asyncio.to_thread(store_evaluation, db, problem, language, code, evaluation)
+    return evaluation
+
+
+async def _evaluate_submission(db, problem: ProgrammingProblem, language: str, code: str) -> dict:
+    """Score from test cases when the problem has them, otherwise from the LLM"""
+    test_cases = await asyncio.to_thread(_test_cases, db, problem.id)
+    judged = bool(test_cases) and supported_language(language)
+    
+    screened = await prescreen_submission(problem, language, code, judged=judged)
+    if screened:
+        return screened
+    
+    if not judged:
+        return await _ai_evaluation(db, problem, language, code)
+    
+    judged = await judge_submission(
+        code, language, test_cases,
+        time_limit=problem.time_limit,
+        memory_limit=problem.memory_limit,
+        checker=problem.checker
+    )
+    
+    if judged["compile_error"]:
+        return {
+            "score": 0.0,
+            "status": "failed",
+            "feedback": f"Compilation failed:\n{judged['compile_error']}",
+            "judge": judged
+        }
+    
+    summary = f"Passed {judged['passed']}/{judged['total']} test cases."
+    try:
+        review = await _ai_evaluation(db, problem, language, code)
+    except EvaluationDeferred:
+        # The judge score doesn't depend on the LLM; record it and add the review later
+        return {
+            "score": round(10 * judged["passed"] / judged["total"], 2),
+            "status": judged["status"],
+            "feedback": summary,
+            "feedback_pending": True,
+            "judge": judged
+        }
+    return {
+        "score": round(10 * judged["passed"] / judged["total"], 2),
+        "status": judged["status"],
+        "feedback": f"{summary} {review['feedback']}",
+        "suggestions": review.get("suggestions", ""),
+        "usage": review.get("usage"),
+        "cached": review.get("cached", False),
+        "judge": judged
+    }
+
+
+def _refresh_completed_result(db, user_id: int):
+    """Fold a late evaluation into an already completed Stage 1 result"""
+    result = db.query(Stage1Result).filter(
+        Stage1Result.user_id == user_id,
+        Stage1Result.completed_at.isnot(None)
+    ).first()
+    if not result:
+        return
+
+    mcq_score, programming_score = stage1_scores(db, user_id)
+    result.mcq_score = mcq_score
+    result.programming_score = programming_score
+    result.total_score = mcq_score + programming_score
+    db.commit()
+    stage1_leaderboard.invalidate()
+
+
+def _mark_failed(attempt_id: int):
+    db = SessionLocal()
+    try:
+        attempts = db.query(ProgrammingQuestionAttempt).filter(
+            ProgrammingQuestionAttempt.id == attempt_id
+        )
+        # A recorded judge score stands; only its pending review is given up
+        attempts.filter(
+            ProgrammingQuestionAttempt.evaluation_state == 'feedback_pending'
+        ).update({"evaluation_state": "done"}, synchronize_session=False)
+        attempts.filter(
+            ProgrammingQuestionAttempt.evaluation_state != 'done'
+        ).update({"evaluation_state": "failed"}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
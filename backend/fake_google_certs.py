@@ -0,0 +1,104 @@
+"""
+Local stand-in for Google's ID-token signing certificates.
+
+Serves a self-signed certificate in the same shape as
+https://www.googleapis.com/oauth2/v1/certs and mints ID tokens signed
+with its key, so Google login can be exercised offline:
+
+    python fake_google_certs.py
+    GOOGLE_CERTS_URL=http://localhost:8002/oauth2/v1/certs GOOGLE_CLIENT_ID=fake-client uvicorn main:app
+    curl "http://localhost:8002/token?email=alice@example.com"
+
+POST /rotate swaps in a fresh key to test the refresh on an unknown kid.
+"""
+from fastapi import FastAPI, Response
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from datetime import datetime, timedelta
+from google.auth import crypt, jwt as google_jwt
+import os
+import time
+import uuid
+import uvicorn
+
+FAKE_GOOGLE_PORT = int(os.getenv("FAKE_GOOGLE_PORT", 8002))
+FAKE_GOOGLE_CERTS_MAX_AGE = int(os.getenv("FAKE_GOOGLE_CERTS_MAX_AGE", 3600))
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID", "fake-client")
+
+app = FastAPI(title="Fake Google Certs")
+
+_signer = None
+_cert_pem = None
+_stats = {"cert_fetches": 0}
+
+
+def _new_key():
+    """Generate a key pair and a self-signed certificate for it"""
+    global _signer, _cert_pem
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-google-certs")])
+    now = datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=30))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    _signer = crypt.RSASigner.from_string(key_pem, key_id=uuid.uuid4().hex)
+    _cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+_new_key()
+
+
+@app.get("/oauth2/v1/certs")
+async def certs(response: Response):
+    """Current signing certificates, cacheable like Google's"""
+    _stats["cert_fetches"] += 1
+    response.headers["cache-control"] = f"public, max-age={FAKE_GOOGLE_CERTS_MAX_AGE}"
+    return {_signer.key_id: _cert_pem}
+
+
+@app.get("/token")
+async def token(email: str, name: str = "", ttl: int = 3600):
+    """Mint an ID token for this email, signed with the current key"""
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": GOOGLE_CLIENT_ID,
+        "sub": uuid.uuid5(uuid.NAMESPACE_DNS, email).hex,
+        "email": email,
+        "email_verified": True,
+        "name": name or email.split("@")[0],
+        "picture": "",
+        "iat": now,
+        "exp": now + ttl
+    }
+    return {"id_token": google_jwt.encode(_signer, payload).decode()}
+
+
+@app.post("/rotate")
+async def rotate():
+    """Replace the signing key (tokens from the old key stop verifying)"""
+    _new_key()
+    return {"kid": _signer.key_id}
+
+
+@app.get("/stats")
+async def stats():
+    return _stats
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=FAKE_GOOGLE_PORT)
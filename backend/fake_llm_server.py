@@ -0,0 +1,76 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Lets the AI evaluator be exercised offline with a predictable latency:
+
+    FAKE_LLM_LATENCY=2.0 python fake_llm_server.py
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake python bench_ai_eval.py
+
+Set FAKE_LLM_ERROR_RATE to make a share of requests fail with 429/503.
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+import uvicorn
+
+FAKE_LLM_PORT = int(os.getenv("FAKE_LLM_PORT", 8001))
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", 2.0))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", 0.0))  # share of 429/503 replies
+
+app = FastAPI(title="Fake LLM Server")
+
+FAKE_EVALUATION = {
+    "score": 7,
+    "status": "partial",
+    "correctness": 3,
+    "code_quality": 2,
+    "efficiency": 1,
+    "edge_cases": 1,
+    "feedback": "Fake evaluation from the local LLM stub.",
+    "suggestions": "None."
+}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """Return a canned evaluation after the configured delay"""
+    body = await request.json()
+
+    if random.random() < FAKE_LLM_ERROR_RATE:
+        status_code = random.choice([429, 503])
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": {"message": "Simulated failure", "type": "fake_error"}},
+            headers={"retry-after": "0.5"} if status_code == 429 else {}
+        )
+
+    await asyncio.sleep(FAKE_LLM_LATENCY)
+
+    content = json.dumps(FAKE_EVALUATION)
+    prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4
+        }
+    }
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=FAKE_LLM_PORT)
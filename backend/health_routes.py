@@ -2,9 +2,22 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from database import get_db
+from auth_routes import get_admin_user
+from evaluation_cache import cache_stats
+from prescreen import prescreen_stats
+from ai_evaluator import ai_breaker, usage_stats
+from evaluation_queue import queue_stats
+from activity_log import activity_log_stats
+from user_cache import user_cache_stats
+from notification_hub import notification_hub_stats
+from dashboard_cache import dashboard_cache_stats
+from contest_schedule import contest_schedule_info
 
 router = APIRouter(tags=["health"])
 
+# Internal queue, cache and breaker state; not for participants
+admin_only = [Depends(get_admin_user)]
+
 
 @router.get("/")
 async def root():
@@ -24,3 +37,45 @@ async def health_check(db: Session = Depends(get_db)):
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+
+
+@router.get("/api/health/evaluator", dependencies=admin_only)
+async def evaluator_health():
+    """AI evaluator pipeline counters"""
+    return {
+        "circuit_breaker": ai_breaker.stats(),
+        "token_usage": usage_stats(),
+        "queue": queue_stats(),
+        "prescreen": prescreen_stats(),
+        "cache": cache_stats()
+    }
+
+
+@router.get("/api/health/activity-log", dependencies=admin_only)
+async def activity_log_health():
+    """Activity log writer queue and throughput counters"""
+    return activity_log_stats()
+
+
+@router.get("/api/health/user-cache", dependencies=admin_only)
+async def user_cache_health():
+    """Authenticated-user cache counters"""
+    return user_cache_stats()
+
+
+@router.get("/api/health/notifications", dependencies=admin_only)
+async def notifications_health():
+    """Notification push channel counters"""
+    return notification_hub_stats()
+
+
+@router.get("/api/health/dashboard-cache", dependencies=admin_only)
+async def dashboard_cache_health():
+    """Dashboard payload cache counters"""
+    return dashboard_cache_stats()
+
+
+@router.get("/api/health/schedule", dependencies=admin_only)
+async def schedule_health():
+    """Current contest phases and the next transition"""
+    return contest_schedule_info()
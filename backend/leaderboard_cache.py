@@ -0,0 +1,141 @@
+"""
+In-process leaderboard snapshots.
+
+A snapshot is the full ordered leaderboard, rebuilt when invalidated
+(e.g. on a Stage 1 completion or a Stage 2 evaluation in this worker) or
+after LEADERBOARD_TTL seconds, so other workers converge too. Reads are
+served from memory: keyset pages via bisect on the (score desc, id)
+order, neighbourhood lookups via a user-id index, and a content hash for
+ETags. Entries are also JSON-encoded once per snapshot so a page can be
+served as bytes without re-serializing.
+"""
+import bisect
+import hashlib
+import json
+import os
+import time
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from models import Stage1Result, Stage2Project, User
+
+LEADERBOARD_TTL = float(os.getenv("LEADERBOARD_TTL", 15))
+
+
+class LeaderboardSnapshot:
+    def __init__(self, rows: list):
+        """rows: (sort score, entry id, user id, public entry dict), best first"""
+        self.entries = [row[3] for row in rows]
+        self._keys = [(-float(row[0]), row[1]) for row in rows]
+        self._user_index = {row[2]: i for i, row in enumerate(rows)}
+        self.built_at = time.monotonic()
+        digest = hashlib.sha1(repr(self._keys).encode())
+        for entry in self.entries:
+            digest.update(repr(sorted(entry.items())).encode())
+        self.etag = f'W/"{digest.hexdigest()[:20]}"'
+        self._encoded = [json.dumps(entry).encode() for entry in self.entries]
+
+    def page(self, limit: int, after_score: float = None, after_id: int = None) -> list:
+        """Entries strictly after the (score, id) cursor"""
+        start = 0
+        if after_score is not None and after_id is not None:
+            start = bisect.bisect_right(self._keys, (-after_score, after_id))
+        return self.entries[start:start + limit]
+
+    def page_bytes(self, limit: int, after_score: float = None, after_id: int = None) -> bytes:
+        """page() as a JSON array, joined from the pre-encoded entries"""
+        start = 0
+        if after_score is not None and after_id is not None:
+            start = bisect.bisect_right(self._keys, (-after_score, after_id))
+        return b"[" + b",".join(self._encoded[start:start + limit]) + b"]"
+
+    def around_user(self, user_id: int, radius: int):
+        """(user's entry, entries within `radius` places), or (None, [])"""
+        i = self._user_index.get(user_id)
+        if i is None:
+            return None, []
+        return self.entries[i], self.entries[max(0, i - radius):i + radius + 1]
+
+
+class LeaderboardCache:
+    def __init__(self, loader, ttl: float = LEADERBOARD_TTL):
+        self._loader = loader
+        self._ttl = ttl
+        self._snapshot = None
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def get(self, db: Session) -> LeaderboardSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot.built_at > self._ttl:
+            snapshot = self._snapshot = LeaderboardSnapshot(self._loader(db))
+        return snapshot
+
+
+def _load_stage1(db: Session) -> list:
+    results = db.query(
+        Stage1Result.id, Stage1Result.user_id, Stage1Result.total_score,
+        Stage1Result.mcq_score, Stage1Result.programming_score,
+        User.full_name, User.college_name
+    ).join(User).filter(
+        Stage1Result.completed_at.isnot(None)
+    ).order_by(Stage1Result.total_score.desc(), Stage1Result.id).all()
+
+    rows = []
+    rank, previous = 0, None
+    for position, r in enumerate(results, 1):
+        total = float(r.total_score)
+        if total != previous:
+            rank, previous = position, total
+        rows.append((total, r.id, r.user_id, {
+            "id": r.id,
+            "rank": rank,
+            "user_name": r.full_name,
+            "college": r.college_name,
+            "total_score": total,
+            "mcq_score": float(r.mcq_score),
+            "programming_score": float(r.programming_score)
+        }))
+    return rows
+
+
+def _load_stage2(db: Session) -> list:
+    results = db.query(
+        Stage2Project.id, Stage2Project.user_id, Stage2Project.project_title,
+        Stage2Project.ui_ux_score, Stage2Project.functionality_score,
+        Stage2Project.code_quality_score, Stage2Project.innovation_score,
+        Stage2Project.total_score, Stage2Project.is_qualified,
+        User.full_name, User.college_name
+    ).join(User).filter(
+        Stage2Project.total_score.isnot(None)
+    ).order_by(Stage2Project.total_score.desc(), Stage2Project.id).all()
+
+    rows = []
+    for position, r in enumerate(results, 1):
+        total = float(r.total_score)
+        rows.append((total, r.id, r.user_id, {
+            "id": r.id,
+            "rank": position,
+            "user_name": r.full_name,
+            "college": r.college_name,
+            "project_title": r.project_title,
+            "ui_ux_score": float(r.ui_ux_score or 0),
+            "functionality_score": float(r.functionality_score or 0),
+            "code_quality_score": float(r.code_quality_score or 0),
+            "innovation_score": float(r.innovation_score or 0),
+            "total_score": total,
+            "is_qualified": r.is_qualified
+        }))
+    return rows
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+stage1_leaderboard = LeaderboardCache(_load_stage1)
+stage2_leaderboard = LeaderboardCache(_load_stage2)
@@ -8,6 +8,15 @@ from notifications_routes import router as notifications_router
 from health_routes import router as health_router
 from stage1_routes import router as stage1_router
 from stage2_routes import router as stage2_router
+from ai_evaluator import close_ai_client
+from evaluation_queue import start_evaluation_workers, stop_evaluation_workers
+from code_judge import start_judge_pool, stop_judge_pool
+from question_bank import load_question_bank
+from contest_schedule import load_contest_schedule
+from answer_key import publish_answer_key, close_answer_key
+from tab_tracker import start_tab_tracker, stop_tab_tracker
+from activity_log import start_activity_writer, stop_activity_writer
+from notification_hub import start_notification_hub, stop_notification_hub
 
 app = FastAPI(title="Coding Ka Big Boss - Hackathon Platform")
 
@@ -31,5 +40,31 @@ app.include_router(stage1_router)
 app.include_router(stage2_router)
 
 
+# ============== LIFECYCLE ==============
+
+@app.on_event("startup")
+async def startup():
+    await start_activity_writer()
+    load_contest_schedule()
+    load_question_bank()
+    publish_answer_key()
+    await start_judge_pool()
+    await start_evaluation_workers()
+    await start_tab_tracker()
+    await start_notification_hub()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await stop_notification_hub()
+    await stop_tab_tracker()
+    await stop_evaluation_workers()
+    await stop_judge_pool()
+    await close_ai_client()
+    close_answer_key()
+    # Last, so activity queued by the steps above is written too
+    await stop_activity_writer()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Create missing tables and apply schema changes to an existing database.
+
+Every step checks the live schema first, so the script is safe to re-run:
+
+    python migrations.py
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+from models import Base
+
+
+def _has_column(conn, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def _has_index(conn, table: str, index: str) -> bool:
+    return any(i["name"] == index for i in inspect(conn).get_indexes(table))
+
+
+def add_evaluation_state(conn):
+    """programming_question_attempts.evaluation_state for the evaluation queue"""
+    if _has_column(conn, "programming_question_attempts", "evaluation_state"):
+        return False
+    conn.execute(text(
+        "ALTER TABLE programming_question_attempts "
+        "ADD COLUMN evaluation_state VARCHAR(20) NULL AFTER status"
+    ))
+    # Attempts evaluated before the queue existed are already final
+    conn.execute(text(
+        "UPDATE programming_question_attempts SET evaluation_state = 'done' "
+        "WHERE status IS NOT NULL"
+    ))
+    return True
+
+
+def add_token_usage(conn):
+    """programming_question_attempts.prompt_tokens / completion_tokens"""
+    if _has_column(conn, "programming_question_attempts", "prompt_tokens"):
+        return False
+    conn.execute(text(
+        "ALTER TABLE programming_question_attempts "
+        "ADD COLUMN prompt_tokens INT DEFAULT 0 AFTER ai_feedback, "
+        "ADD COLUMN completion_tokens INT DEFAULT 0 AFTER prompt_tokens"
+    ))
+    return True
+
+
+def add_stage1_rank_index(conn):
+    """Index used to compute Stage 1 ranks on read"""
+    if _has_index(conn, "stage1_results", "ix_stage1_results_score_completed"):
+        return False
+    conn.execute(text(
+        "CREATE INDEX ix_stage1_results_score_completed "
+        "ON stage1_results (total_score, completed_at)"
+    ))
+    return True
+
+
+def _dedupe_and_index(conn, table: str, key: str, index: str):
+    # Keep the newest row per (user_id, key) and drop the rest
+    conn.execute(text(
+        f"DELETE older FROM {table} older "
+        f"JOIN {table} newer ON newer.user_id = older.user_id "
+        f"AND newer.{key} = older.{key} AND newer.id > older.id"
+    ))
+    conn.execute(text(f"CREATE UNIQUE INDEX {index} ON {table} (user_id, {key})"))
+
+
+def add_attempt_unique_keys(conn):
+    """Unique (user, question) / (user, problem) keys on the attempts tables"""
+    applied = False
+    if not _has_index(conn, "mcq_attempts", "uq_mcq_attempts_user_question"):
+        _dedupe_and_index(conn, "mcq_attempts", "question_id", "uq_mcq_attempts_user_question")
+        applied = True
+    if not _has_index(conn, "programming_question_attempts", "uq_programming_attempts_user_problem"):
+        # Tab switches recorded on duplicate rows still count
+        conn.execute(text(
+            "UPDATE programming_question_attempts p JOIN ("
+            "  SELECT MAX(id) AS keep_id, SUM(tab_inactivity_count) AS tabs "
+            "  FROM programming_question_attempts "
+            "  GROUP BY user_id, problem_id HAVING COUNT(*) > 1"
+            ") d ON p.id = d.keep_id "
+            "SET p.tab_inactivity_count = d.tabs"
+        ))
+        _dedupe_and_index(
+            conn, "programming_question_attempts", "problem_id", "uq_programming_attempts_user_problem"
+        )
+        applied = True
+    return applied
+
+
+def add_unread_notifications(conn):
+    """users.unread_notifications counter and the (user, is_read, created_at) index"""
+    applied = False
+    if not _has_index(conn, "notifications", "ix_notifications_user_read_created"):
+        conn.execute(text(
+            "CREATE INDEX ix_notifications_user_read_created "
+            "ON notifications (user_id, is_read, created_at)"
+        ))
+        applied = True
+    if not _has_column(conn, "users", "unread_notifications"):
+        conn.execute(text(
+            "ALTER TABLE users "
+            "ADD COLUMN unread_notifications INT NOT NULL DEFAULT 0 AFTER profile_picture_url"
+        ))
+        conn.execute(text(
+            "UPDATE users u JOIN ("
+            "  SELECT user_id, COUNT(*) AS unread FROM notifications "
+            "  WHERE is_read = 0 GROUP BY user_id"
+            ") n ON n.user_id = u.id "
+            "SET u.unread_notifications = n.unread"
+        ))
+        applied = True
+    return applied
+
+
+def add_problem_checker(conn):
+    """programming_problems.checker; Two Sum accepts its indices in any order"""
+    if _has_column(conn, "programming_problems", "checker"):
+        return False
+    conn.execute(text(
+        "ALTER TABLE programming_problems "
+        "ADD COLUMN checker VARCHAR(20) DEFAULT 'exact' AFTER memory_limit"
+    ))
+    conn.execute(text(
+        "UPDATE programming_problems SET checker = 'unordered' "
+        "WHERE title = 'Two Sum Problem'"
+    ))
+    return True
+
+
+MIGRATIONS = [
+    add_evaluation_state,
+    add_token_usage,
+    add_stage1_rank_index,
+    add_attempt_unique_keys,
+    add_unread_notifications,
+    add_problem_checker,
+]
+
+
+def main():
+    print("🛠  Applying database migrations...")
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        for migration in MIGRATIONS:
+            applied = migration(conn)
+            print(f"{'✅ Applied' if applied else '⏭  Skipped'}: {migration.__name__}")
+
+
+if __name__ == "__main__":
+    main()
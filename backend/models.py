@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DECIMAL, TIMESTAMP, JSON, ForeignKey, func, CHAR
+from sqlalchemy import Column, Integer, String, Text, Boolean, DECIMAL, TIMESTAMP, DateTime, JSON, ForeignKey, func, CHAR, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -19,6 +19,7 @@ class User(Base):
     github_url = Column(String(255))
     linkedin_url = Column(String(255))
     profile_picture_url = Column(Text)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default='0')
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     
@@ -59,6 +60,7 @@ class ProgrammingProblem(Base):
     difficulty_level = Column(String(20))
     time_limit = Column(Integer)
     memory_limit = Column(Integer)
+    checker = Column(String(20), default='exact')  # exact, unordered (see code_judge.CHECKERS)
     marks = Column(Integer, default=10)
     input_format = Column(Text)
     output_format = Column(Text)
@@ -73,6 +75,21 @@ class ProgrammingProblem(Base):
     
     # Relationships
     attempts = relationship("ProgrammingQuestionAttempt", back_populates="problem", cascade="all, delete-orphan")
+    test_cases = relationship("ProgrammingTestCase", back_populates="problem", cascade="all, delete-orphan")
+
+
+class ProgrammingTestCase(Base):
+    __tablename__ = 'programming_test_cases'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    problem_id = Column(Integer, ForeignKey('programming_problems.id', ondelete='CASCADE'), nullable=False, index=True)
+    input_data = Column(Text, nullable=False)
+    expected_output = Column(Text, nullable=False)
+    is_hidden = Column(Boolean, default=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    # Relationships
+    problem = relationship("ProgrammingProblem", back_populates="test_cases")
 
 
 class MCQAttempt(Base):
@@ -89,6 +106,11 @@ class MCQAttempt(Base):
     # Relationships
     user = relationship("User", back_populates="mcq_attempts")
     question = relationship("MCQQuestion", back_populates="attempts")
+    
+    # One row per answer; writes are INSERT ... ON DUPLICATE KEY UPDATE
+    __table_args__ = (
+        Index('uq_mcq_attempts_user_question', 'user_id', 'question_id', unique=True),
+    )
 
 
 class ProgrammingQuestionAttempt(Base):
@@ -100,15 +122,44 @@ class ProgrammingQuestionAttempt(Base):
     code = Column(Text, nullable=False)
     language = Column(String(50), nullable=False)
     status = Column(String(50))
+    evaluation_state = Column(String(20))  # queued, running, feedback_pending, done, failed
     tab_inactivity_count = Column(Integer, default=0)
     score = Column(DECIMAL(5, 2), default=0)
     ai_feedback = Column(Text)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
     submitted_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="programming_attempts")
     problem = relationship("ProgrammingProblem", back_populates="attempts")
+    
+    __table_args__ = (
+        Index('uq_programming_attempts_user_problem', 'user_id', 'problem_id', unique=True),
+    )
+
+
+class EvaluationCache(Base):
+    __tablename__ = 'evaluation_cache'
+    
+    cache_key = Column(CHAR(64), primary_key=True)
+    problem_id = Column(Integer, ForeignKey('programming_problems.id', ondelete='CASCADE'), nullable=False, index=True)
+    problem_hash = Column(CHAR(64), nullable=False)
+    language = Column(String(50), nullable=False)
+    result = Column(JSON, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class UserQuestionSet(Base):
+    __tablename__ = 'user_question_sets'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False)
+    mcq_question_ids = Column(JSON, nullable=False)
+    problem_ids = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
 
 
 class Stage1Result(Base):
@@ -127,6 +178,11 @@ class Stage1Result(Base):
     
     # Relationships
     user = relationship("User", back_populates="stage1_result")
+    
+    # Covers "how many completed results score higher than X" for rank-on-read
+    __table_args__ = (
+        Index('ix_stage1_results_score_completed', 'total_score', 'completed_at'),
+    )
 
 
 class Stage2Project(Base):
@@ -181,5 +237,19 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
     
+    __table_args__ = (
+        Index('ix_notifications_user_read_created', 'user_id', 'is_read', 'created_at'),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="notifications")
+
+
+class ContestPhase(Base):
+    __tablename__ = 'contest_phases'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    stage = Column(String(20), nullable=False)  # stage1, stage2
+    phase = Column(String(20), nullable=False)  # open, reopened, ...
+    starts_at = Column(DateTime)  # NULL = since the beginning (local time)
+    ends_at = Column(DateTime)  # NULL = never closes
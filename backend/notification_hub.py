@@ -0,0 +1,241 @@
+"""
+Push channel for user notifications.
+
+Routes that create a Notification call publish_notification() after
+committing it; the hub hands the event to the configured backplane,
+which delivers it to every open stream of that user on every worker.
+Each stream is a small bounded queue read by the SSE endpoint in
+notifications_routes.
+
+Backplanes (NOTIFY_BACKPLANE):
+  local     - single worker; events go straight to local subscribers
+  database  - several workers; each worker also polls the notifications
+              table for rows created elsewhere (one query per worker per
+              NOTIFY_POLL_INTERVAL, independent of how many clients are
+              connected). Ids the poll cursor skips over may belong to
+              transactions that commit later, so they are looked up
+              again on every poll for NOTIFY_GAP_WINDOW seconds.
+
+A stream that falls more than NOTIFY_SUBSCRIBER_QUEUE events behind
+loses its oldest events; the client can always refetch the list.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+
+from database import SessionLocal
+from models import Notification
+
+NOTIFY_BACKPLANE = os.getenv("NOTIFY_BACKPLANE", "local")
+NOTIFY_POLL_INTERVAL = float(os.getenv("NOTIFY_POLL_INTERVAL", 1))
+NOTIFY_SUBSCRIBER_QUEUE = int(os.getenv("NOTIFY_SUBSCRIBER_QUEUE", 32))
+NOTIFY_GAP_WINDOW = float(os.getenv("NOTIFY_GAP_WINDOW", 30))
+NOTIFY_POLL_BATCH = 1000
+NOTIFY_MAX_GAPS = 10000
+
+_subscribers = {}  # user id -> set of asyncio.Queue
+_loop = None
+_backplane = None
+_stats = {"published": 0, "delivered": 0, "dropped": 0, "polled": 0, "connections_opened": 0}
+
+
+def notification_event(notification: Notification) -> dict:
+    """The JSON payload pushed for a notification (same shape as GET /api/notifications)"""
+    created_at = notification.created_at or datetime.utcnow()
+    return {
+        "id": notification.id,
+        "user_id": notification.user_id,
+        "title": notification.title,
+        "message": notification.message,
+        "type": notification.type,
+        "is_read": bool(notification.is_read),
+        # Same +5:30 adjustment as the list endpoint
+        "created_at": (created_at + timedelta(hours=5, minutes=30)).isoformat()
+    }
+
+
+def _deliver(event: dict):
+    """Fan one event out to this worker's streams for its user (event loop only)"""
+    queues = _subscribers.get(event["user_id"])
+    if not queues:
+        return
+    data = json.dumps(event)  # serialized once, however many tabs are open
+    for queue in queues:
+        if queue.full():
+            queue.get_nowait()
+            _stats["dropped"] += 1
+        queue.put_nowait((event["id"], data))
+        _stats["delivered"] += 1
+
+
+# ============== BACKPLANES ==============
+
+class Backplane:
+    """Carries published events to the subscribers of every worker"""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, event: dict):
+        raise NotImplementedError
+
+
+class LocalBackplane(Backplane):
+    """Single worker: deliver in-process"""
+
+    def publish(self, event: dict):
+        _deliver(event)
+
+
+class DatabaseBackplane(Backplane):
+    """Several workers: deliver locally, and poll for rows other workers created"""
+
+    def __init__(self, poll_interval: float = NOTIFY_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._cursor = 0
+        self._gaps = {}  # id skipped by the cursor -> monotonic time it was skipped
+        self._published_here = deque(maxlen=10000)  # ids already delivered locally
+        self._poller = None
+
+    def _max_id(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(func.max(Notification.id)).scalar() or 0
+        finally:
+            db.close()
+
+    def _fetch_new(self, cursor: int, gaps: list) -> list:
+        db = SessionLocal()
+        try:
+            condition = Notification.id > cursor
+            if gaps:
+                condition = or_(condition, Notification.id.in_(gaps))
+            rows = db.query(Notification).filter(
+                condition
+            ).order_by(Notification.id).limit(NOTIFY_POLL_BATCH).all()
+            return [notification_event(row) for row in rows]
+        finally:
+            db.close()
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not _subscribers:
+                # Nobody to deliver to; just keep the cursor current
+                self._cursor = max(self._cursor, await asyncio.to_thread(self._max_id))
+                continue
+            now = time.monotonic()
+            # Gaps still missing after the window were rolled back, not late
+            self._gaps = {i: t for i, t in self._gaps.items() if now - t < NOTIFY_GAP_WINDOW}
+            try:
+                events = await asyncio.to_thread(self._fetch_new, self._cursor, list(self._gaps))
+            except Exception as e:
+                print(f"⚠️  Notification poll failed: {e}")
+                continue
+            published_here = set(self._published_here)
+            for event in events:
+                event_id = event["id"]
+                if event_id > self._cursor:
+                    for skipped in range(self._cursor + 1, event_id):
+                        self._gaps[skipped] = now
+                    self._cursor = event_id
+                elif self._gaps.pop(event_id, None) is None:
+                    continue  # already handled
+                if event_id not in published_here:
+                    _stats["polled"] += 1
+                    _deliver(event)
+            while len(self._gaps) > NOTIFY_MAX_GAPS:
+                del self._gaps[next(iter(self._gaps))]
+
+    async def start(self):
+        self._cursor = await asyncio.to_thread(self._max_id)
+        self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+
+    def publish(self, event: dict):
+        self._published_here.append(event["id"])
+        _deliver(event)
+
+
+BACKPLANES = {
+    "local": LocalBackplane,
+    "database": DatabaseBackplane
+}
+
+
+# ============== PUBLISH / SUBSCRIBE ==============
+
+def publish_notification(notification: Notification):
+    """Push a committed notification to its user's open streams; safe from any thread"""
+    if _loop is None:
+        # Hub not running (scripts, tests): the row is still in the table
+        return
+    publish_events([notification_event(notification)])
+
+
+def publish_events(events: list):
+    """Push notification_event() payloads built by the caller; safe from any thread.
+
+    Bulk senders build the payloads before committing, while the rows
+    are still loaded, rather than reloading every expired row afterwards.
+    """
+    if _loop is None:
+        return
+    _stats["published"] += len(events)
+    for event in events:
+        _loop.call_soon_threadsafe(_backplane.publish, event)
+
+
+def subscribe(user_id: int) -> asyncio.Queue:
+    """Open a stream for this user; pair with unsubscribe()"""
+    queue = asyncio.Queue(maxsize=NOTIFY_SUBSCRIBER_QUEUE)
+    _subscribers.setdefault(user_id, set()).add(queue)
+    _stats["connections_opened"] += 1
+    return queue
+
+
+def unsubscribe(user_id: int, queue: asyncio.Queue):
+    queues = _subscribers.get(user_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[user_id]
+
+
+async def start_notification_hub(backplane: Backplane = None):
+    """Bind the hub to the running event loop and start the backplane"""
+    global _loop, _backplane
+    _loop = asyncio.get_running_loop()
+    _backplane = backplane or BACKPLANES[NOTIFY_BACKPLANE]()
+    await _backplane.start()
+
+
+async def stop_notification_hub():
+    global _loop, _backplane
+    if _backplane is not None:
+        await _backplane.stop()
+    _loop = None
+    _backplane = None
+
+
+def notification_hub_stats() -> dict:
+    return {
+        **_stats,
+        "backplane": type(_backplane).__name__ if _backplane else None,
+        "subscribed_users": len(_subscribers),
+        "open_streams": sum(len(queues) for queues in _subscribers.values())
+    }
@@ -1,18 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from typing import Optional
+import asyncio
+import os
 
-from database import get_db
-from models import User, Notification
-from schemas import NotificationResponse
-from auth_routes import get_current_user
+from database import get_db, SessionLocal
+from models import Notification
+from schemas import NotificationResponse, NotificationsMarkRead
+from auth import create_access_token, verify_token
+from auth_routes import Principal, get_current_principal
+from notification_hub import subscribe, unsubscribe, notification_event
+from unread_counter import mark_read, unread_count
 from datetime import timedelta
+import json
+
+NOTIFY_HEARTBEAT = float(os.getenv("NOTIFY_HEARTBEAT", 25))
+NOTIFY_TICKET_SECONDS = int(os.getenv("NOTIFY_TICKET_SECONDS", 60))
+STREAM_TICKET_SCOPE = "notifications_stream"
 
 router = APIRouter(prefix="/api/notifications", tags=["notifications"])
 
 
 @router.get("", response_model=list[NotificationResponse])
 async def get_notifications(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get user notifications"""
@@ -27,22 +39,110 @@ async def get_notifications(
     return notifications
 
 
+def _missed_events(user_id: int, last_event_id: int) -> list:
+    """Notifications created while a reconnecting stream was away"""
+    db = SessionLocal()
+    try:
+        rows = db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.id > last_event_id
+        ).order_by(Notification.id).limit(20).all()
+        return [(row.id, json.dumps(notification_event(row))) for row in rows]
+    finally:
+        db.close()
+
+
+def stream_ticket(user_id: int) -> str:
+    """A short-lived token that only opens this user's notification stream"""
+    return create_access_token(
+        {"user_id": user_id, "scope": STREAM_TICKET_SCOPE},
+        timedelta(seconds=NOTIFY_TICKET_SECONDS)
+    )
+
+
+@router.post("/stream-ticket")
+async def create_stream_ticket(current_user: Principal = Depends(get_current_principal)):
+    """Issue a ticket for GET /stream"""
+    return {"ticket": stream_ticket(current_user.id), "expires_in": NOTIFY_TICKET_SECONDS}
+
+
+@router.get("/stream")
+async def stream_notifications(request: Request, ticket: str, last_event_id: Optional[str] = None):
+    """Server-Sent Events stream of new notifications.
+
+    EventSource can't send headers, so the stream is opened with a
+    ticket from POST /stream-ticket rather than the access token: the
+    URL ends up in access logs, and the ticket expires within
+    NOTIFY_TICKET_SECONDS. No database session is held while the
+    stream is open.
+    """
+    payload = verify_token(ticket)
+    if payload is None or payload.get("scope") != STREAM_TICKET_SCOPE or payload.get("user_id") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid stream ticket"
+        )
+    user_id = payload["user_id"]
+    
+    missed = []
+    # The header on automatic reconnects; the query when the client reopens with a new ticket
+    last_event_id = request.headers.get("last-event-id") or last_event_id or ""
+    if last_event_id.isdigit():
+        missed = await asyncio.to_thread(_missed_events, user_id, int(last_event_id))
+    
+    async def events():
+        queue = subscribe(user_id)
+        try:
+            yield "retry: 5000\n\n"
+            for event_id, data in missed:
+                yield f"event: notification\nid: {event_id}\ndata: {data}\n\n"
+            while True:
+                try:
+                    event_id, data = await asyncio.wait_for(queue.get(), NOTIFY_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: notification\nid: {event_id}\ndata: {data}\n\n"
+        finally:
+            unsubscribe(user_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.put("/read")
+async def mark_notifications_read(
+    body: NotificationsMarkRead,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Mark the given notifications (or all of them) as read in one update"""
+    changed = mark_read(db, current_user.id, body.ids)
+    db.commit()
+    
+    return {"status": "success", "marked": changed, "unread": unread_count(db, current_user.id)}
+
+
 @router.put("/{notification_id}/read")
 async def mark_notification_read(
     notification_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Mark notification as read"""
-    notification = db.query(Notification).filter(
-        Notification.id == notification_id,
-        Notification.user_id == current_user.id
-    ).first()
-    
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
+    if not mark_read(db, current_user.id, [notification_id]):
+        # Nothing changed: either already read or not this user's
+        exists = db.query(Notification.id).filter(
+            Notification.id == notification_id,
+            Notification.user_id == current_user.id
+        ).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="Notification not found")
     
-    notification.is_read = True
     db.commit()
     
     return {"status": "success"}
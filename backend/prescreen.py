@@ -0,0 +1,128 @@
+"""
+Cheap local checks run before a submission reaches the judge or the LLM.
+
+Empty, oversized, unmodified-starter and syntactically invalid code get
+a deterministic zero score straight away instead of a GPT-4o call.
+"""
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+
+from models import ProgrammingProblem
+from evaluation_cache import normalize_code
+
+PRESCREEN_MAX_CODE_BYTES = int(os.getenv("PRESCREEN_MAX_CODE_BYTES", 64 * 1024))
+SYNTAX_CHECK_TIMEOUT = 10
+
+_stats = {"screened": 0, "passed": 0, "empty": 0, "too_large": 0, "starter_code": 0, "syntax_error": 0}
+
+
+def _rejection(reason: str, feedback: str) -> dict:
+    _stats[reason] += 1
+    return {
+        "score": 0.0,
+        "status": "failed",
+        "feedback": feedback,
+        "details": {
+            "correctness": 0,
+            "code_quality": 0,
+            "efficiency": 0,
+            "edge_cases": 0
+        },
+        "suggestions": "",
+        "prescreen": reason
+    }
+
+
+def _starter_code(problem: ProgrammingProblem, language: str):
+    return getattr(problem, f"starter_code_{language}", None)
+
+
+async def _external_syntax_check(command: list, filename: str, code: str):
+    """Run a compiler/interpreter syntax check; returns the error text or None"""
+    if not shutil.which(command[0]):
+        return None
+    workdir = tempfile.mkdtemp(prefix="prescreen-")
+    try:
+        with open(os.path.join(workdir, filename), "w") as f:
+            f.write(code)
+        proc = await asyncio.create_subprocess_exec(
+            *command, filename,
+            cwd=workdir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            _, stderr = await asyncio.wait_for(proc.communicate(), timeout=SYNTAX_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None  # inconclusive; let the full pipeline decide
+        if proc.returncode != 0:
+            return stderr.decode("utf-8", "replace").replace(workdir + os.sep, "")[-1000:]
+        return None
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+async def _syntax_error(code: str, language: str, judged: bool):
+    if language == "python":
+        try:
+            compile(code, "main.py", "exec")
+        except (SyntaxError, ValueError) as e:
+            return f"Line {getattr(e, 'lineno', '?')}: {getattr(e, 'msg', e)}"
+        except RecursionError:
+            return "Code is nested too deeply to compile."
+        except MemoryError:
+            return None  # inconclusive; let the full pipeline decide
+        return None
+    if language == "javascript":
+        return await _external_syntax_check(["node", "--check"], "main.js", code)
+    if judged:
+        # The judge compiles C++ and Java itself and scores a compile error as zero
+        return None
+    if language == "cpp":
+        return await _external_syntax_check(["g++", "-std=c++17", "-fsyntax-only"], "main.cpp", code)
+    if language == "java":
+        # javac wants the file named after the public class, like the judge does
+        match = re.search(r"public\s+(?:final\s+)?class\s+(\w+)", code)
+        class_name = match.group(1) if match else "Solution"
+        return await _external_syntax_check(["javac", "-proc:none", "-d", "."], f"{class_name}.java", code)
+    return None
+
+
+async def prescreen_submission(problem: ProgrammingProblem, language: str, code: str, judged: bool = False):
+    """Return a final evaluation for obviously failing code, or None to continue.
+
+    judged: the submission will go to the execution judge, which compiles
+    it anyway, so compiled languages skip their syntax pass.
+    """
+    language = language.lower()
+    _stats["screened"] += 1
+
+    if not code.strip():
+        return _rejection("empty", "No code was submitted.")
+
+    if len(code.encode()) > PRESCREEN_MAX_CODE_BYTES:
+        return _rejection(
+            "too_large",
+            f"Submission exceeds the {PRESCREEN_MAX_CODE_BYTES // 1024} KB size limit."
+        )
+
+    starter = _starter_code(problem, language)
+    if starter and normalize_code(starter, language) == normalize_code(code, language):
+        return _rejection("starter_code", "The starter code was submitted without changes.")
+
+    error = await _syntax_error(code, language, judged)
+    if error:
+        return _rejection("syntax_error", f"Code does not compile:\n{error}")
+
+    _stats["passed"] += 1
+    return None
+
+
+def prescreen_stats() -> dict:
+    rejected = _stats["screened"] - _stats["passed"]
+    return {**_stats, "llm_calls_avoided": rejected}
@@ -0,0 +1,131 @@
+"""
+Prompt construction for the AI evaluator.
+
+Everything that depends only on the problem (statement, samples, rubric
+and response format) is rendered once per problem and cached, and comes
+before the submitted code so the provider can reuse the common prefix
+across submissions. Submissions longer than the token budget are cut
+down to their head and tail with a note of what was omitted.
+"""
+import os
+from functools import lru_cache
+
+AI_PROMPT_MAX_CODE_TOKENS = int(os.getenv("AI_PROMPT_MAX_CODE_TOKENS", 3000))
+AI_COMPLETION_MAX_TOKENS = 500
+
+SYSTEM_PROMPT = "You are an expert programming judge. Analyze code submissions and provide scores in JSON format only."
+
+_RUBRIC = """**Evaluation Criteria:**
+1. **Correctness (40%)**: Does the logic correctly solve the problem for the given sample?
+2. **Code Quality (30%)**: Is the code clean, readable, and well-structured?
+3. **Efficiency (20%)**: Is the algorithm efficient? Any obvious optimizations?
+4. **Edge Cases (10%)**: Does it handle edge cases mentioned in constraints?
+
+**Important:**
+- Do NOT execute the code
+- Analyze the logic and algorithm
+- Check if it would produce the expected output for the sample input
+- Consider time/space complexity
+
+**Response Format (JSON only):**
+{
+    "score": <0-10>,
+    "status": "<passed/failed/partial>",
+    "correctness": <0-4>,
+    "code_quality": <0-3>,
+    "efficiency": <0-2>,
+    "edge_cases": <0-1>,
+    "feedback": "<detailed feedback in 2-3 sentences>",
+    "suggestions": "<improvement suggestions if any>"
+}
+
+Provide only valid JSON, no additional text."""
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate tokens at ~4 characters each. Good enough for budgeting;
+    billed usage is taken from the API response.
+    """
+    return (len(text) + 3) // 4
+
+
+@lru_cache(maxsize=256)
+def problem_prefix(
+    problem_description: str,
+    sample_input: str,
+    sample_output: str,
+    constraints: str = None
+) -> str:
+    """Static part of the prompt for one problem (cached by content)"""
+    constraints_section = f"**Constraints:**\n{constraints}\n\n" if constraints else ""
+    return f"""You are an expert code evaluator for a hackathon. Analyze the code submission at the end of this message.
+
+**Problem Description:**
+{problem_description}
+
+**Sample Input:**
+{sample_input}
+
+**Expected Output:**
+{sample_output}
+
+{constraints_section}{_RUBRIC}
+"""
+
+
+def truncate_code(code: str, max_tokens: int = AI_PROMPT_MAX_CODE_TOKENS):
+    """Keep the head and tail of oversized code; returns (code, truncated)"""
+    if count_tokens(code) <= max_tokens:
+        return code, False
+
+    lines = code.splitlines()
+    head, tail = [], []
+    budget = max_tokens - 20  # room for the omission marker
+    i, j = 0, len(lines) - 1
+    # Alternate between the start and the end so both the setup and the
+    # final output logic stay visible to the grader.
+    while i <= j:
+        cost = count_tokens(lines[i]) + 1
+        if cost > budget:
+            break
+        head.append(lines[i])
+        budget -= cost
+        i += 1
+        if i > j:
+            break
+        cost = count_tokens(lines[j]) + 1
+        if cost > budget:
+            break
+        tail.insert(0, lines[j])
+        budget -= cost
+        j -= 1
+
+    if not head and not tail:
+        # A single enormous line (e.g. minified code): cut by characters
+        return code[:budget * 4] + "\n... [rest of submission omitted] ...", True
+
+    omitted = j - i + 1
+    marker = f"... [{omitted} lines omitted to fit the evaluation budget] ..."
+    return "\n".join(head + [marker] + tail), True
+
+
+def build_prompt(
+    code: str,
+    language: str,
+    problem_description: str,
+    sample_input: str,
+    sample_output: str,
+    constraints: str = None
+):
+    """Return (prompt, truncated) for one submission"""
+    prefix = problem_prefix(problem_description, sample_input, sample_output, constraints)
+    code, truncated = truncate_code(code)
+    note = "\nNote: the submission was truncated; judge only the code shown.\n" if truncated else ""
+    prompt = f"""{prefix}
+**Submitted Code ({language}):**
+```{language}
+{code}
+```
+{note}"""
+    return prompt, truncated
@@ -0,0 +1,164 @@
+"""
+In-memory question bank and per-user question sets.
+
+All MCQ questions and programming problems are loaded once (at startup,
+and again after questions are added) and kept serialized in memory.
+Questions added by seed_questions.py are picked up within
+QUESTION_BANK_TTL seconds. Each user's set is sampled once from a seed derived from their user id
+and stored in user_question_sets, so reloading the page returns the same
+questions and no request ever sorts the question tables. Sets that come
+up short (questions deleted, or assigned while the bank was smaller
+than the quota) are topped up from the bank, keeping their valid ids.
+"""
+import os
+import random
+import time
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import MCQQuestion, ProgrammingProblem, UserQuestionSet
+from schemas import MCQQuestionResponse, ProgrammingProblemResponse
+
+MCQ_PER_USER = int(os.getenv("MCQ_PER_USER", 10))
+PROBLEMS_PER_USER = int(os.getenv("PROBLEMS_PER_USER", 2))
+QUESTION_SET_SALT = os.getenv("QUESTION_SET_SALT", "")
+QUESTION_BANK_TTL = float(os.getenv("QUESTION_BANK_TTL", 300))
+
+_mcq = {}         # question id -> MCQQuestionResponse payload
+_problems = {}    # problem id -> ProgrammingProblemResponse payload
+_mcq_ids = []
+_problem_ids = []
+_loaded_at = None
+
+
+def load_question_bank(db: Session = None):
+    """(Re)load every question into memory"""
+    global _mcq, _problems, _mcq_ids, _problem_ids, _loaded_at
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        mcq = {
+            q.id: MCQQuestionResponse.from_orm(q).model_dump()
+            for q in db.query(MCQQuestion).all()
+        }
+        problems = {
+            p.id: ProgrammingProblemResponse.from_orm(p).model_dump()
+            for p in db.query(ProgrammingProblem).all()
+        }
+    finally:
+        if own_session:
+            db.close()
+
+    # Swap in whole structures so concurrent readers never see a partial bank
+    _mcq, _problems = mcq, problems
+    _mcq_ids, _problem_ids = sorted(mcq), sorted(problems)
+    _loaded_at = time.monotonic()
+    print(f"📚 Question bank loaded: {len(mcq)} MCQ, {len(problems)} programming")
+
+
+def _ensure_loaded(db: Session):
+    if _loaded_at is None or time.monotonic() - _loaded_at > QUESTION_BANK_TTL:
+        load_question_bank(db)
+
+
+def _sample(ids: list, k: int, rng: random.Random) -> list:
+    # random.sample picks k of n in O(k) without copying the population
+    return rng.sample(ids, min(k, len(ids)))
+
+
+def _top_up(assigned: list, bank_ids: list, cached: dict, quota: int, rng: random.Random) -> list:
+    """Keep the assigned ids still in the bank and fill the set back up to quota"""
+    kept = [i for i in assigned if i in cached]
+    wanted = min(quota, len(bank_ids)) - len(kept)
+    if wanted <= 0:
+        return kept
+    taken = set(kept)
+    return kept + _sample([i for i in bank_ids if i not in taken], wanted, rng)
+
+
+def _under_filled(assigned: list, bank_ids: list, cached: dict, quota: int) -> bool:
+    return sum(1 for i in assigned if i in cached) < min(quota, len(bank_ids))
+
+
+def _refresh_if_newer(db: Session, question_set: UserQuestionSet):
+    """Reload once if the set names questions added since our last load.
+
+    Ids that no longer exist in the database (deleted questions) don't
+    trigger a reload; they are dropped and the set is topped up.
+    """
+    unknown_mcq = [i for i in question_set.mcq_question_ids if i not in _mcq]
+    unknown_problems = [i for i in question_set.problem_ids if i not in _problems]
+    if unknown_mcq and db.query(MCQQuestion.id).filter(MCQQuestion.id.in_(unknown_mcq)).first():
+        load_question_bank(db)
+    elif unknown_problems and db.query(ProgrammingProblem.id).filter(
+        ProgrammingProblem.id.in_(unknown_problems)
+    ).first():
+        load_question_bank(db)
+
+
+def _get_or_create_set(db: Session, user_id: int) -> UserQuestionSet:
+    question_set = db.query(UserQuestionSet).filter(
+        UserQuestionSet.user_id == user_id
+    ).first()
+    if question_set:
+        _refresh_if_newer(db, question_set)
+        # Questions deleted since, or a set assigned while the bank was
+        # smaller than the quota: top it up, keeping what is still valid
+        if (_under_filled(question_set.mcq_question_ids, _mcq_ids, _mcq, MCQ_PER_USER)
+                or _under_filled(question_set.problem_ids, _problem_ids, _problems, PROBLEMS_PER_USER)):
+            rng = random.Random(f"{QUESTION_SET_SALT}:{user_id}:top-up")
+            question_set.mcq_question_ids = _top_up(
+                question_set.mcq_question_ids, _mcq_ids, _mcq, MCQ_PER_USER, rng
+            )
+            question_set.problem_ids = _top_up(
+                question_set.problem_ids, _problem_ids, _problems, PROBLEMS_PER_USER, rng
+            )
+            db.commit()
+        return question_set
+
+    rng = random.Random(f"{QUESTION_SET_SALT}:{user_id}")
+    question_set = UserQuestionSet(
+        user_id=user_id,
+        mcq_question_ids=_sample(_mcq_ids, MCQ_PER_USER, rng),
+        problem_ids=_sample(_problem_ids, PROBLEMS_PER_USER, rng)
+    )
+    db.add(question_set)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A parallel request assigned the set first; use theirs
+        db.rollback()
+        question_set = db.query(UserQuestionSet).filter(
+            UserQuestionSet.user_id == user_id
+        ).first()
+    return question_set
+
+
+def _resolve(bank_ids, cached: dict) -> list:
+    # Ids missing from the bank (deleted questions) are dropped; newly
+    # added ones are picked up by the QUESTION_BANK_TTL reload
+    return [key for key in bank_ids if key in cached]
+
+
+def get_user_mcq_questions(db: Session, user_id: int) -> list:
+    """The user's MCQ questions, assigning a set on first request"""
+    _ensure_loaded(db)
+    question_set = _get_or_create_set(db, user_id)
+    ids = _resolve(question_set.mcq_question_ids, _mcq)
+    return [_mcq[i] for i in ids]
+
+
+def get_user_problems(db: Session, user_id: int) -> list:
+    """The user's programming problems, assigning a set on first request"""
+    _ensure_loaded(db)
+    question_set = _get_or_create_set(db, user_id)
+    ids = _resolve(question_set.problem_ids, _problems)
+    return [_problems[i] for i in ids]
+
+
+def problem_exists(db: Session, problem_id: int) -> bool:
+    """Whether a programming problem is in the bank"""
+    _ensure_loaded(db)
+    return problem_id in _problems
@@ -0,0 +1,29 @@
+"""
+Stage 1 ranks computed on read.
+
+Ranks are never written back to stage1_results: a participant's rank is
+one plus the number of completed results with a higher total, which
+the (total_score, completed_at) index answers without touching other
+rows. Ties share a rank (1, 2, 2, 4, ...).
+"""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Stage1Result
+from schemas import Stage1ResultResponse
+
+
+def stage1_rank(db: Session, total_score) -> int:
+    """Competition rank of a completed Stage 1 total"""
+    higher = db.query(func.count(Stage1Result.id)).filter(
+        Stage1Result.completed_at.isnot(None),
+        Stage1Result.total_score > total_score
+    ).scalar()
+    return higher + 1
+
+
+def stage1_result_response(db: Session, result: Stage1Result) -> Stage1ResultResponse:
+    """Serialize a result with its live rank (None until completed)"""
+    response = Stage1ResultResponse.from_orm(result)
+    response.rank = stage1_rank(db, result.total_score) if result.completed_at else None
+    return response
@@ -64,6 +64,9 @@ class MCQAnswerSubmit(BaseModel):
     selected_option: str = Field(..., pattern="^[A-D]$")
     time_taken: Optional[int] = None
 
+class MCQBatchSubmit(BaseModel):
+    answers: List[MCQAnswerSubmit] = Field(..., min_length=1, max_length=100)
+
 
 # Programming Problem Schemas
 class ProgrammingProblemResponse(BaseModel):
@@ -129,6 +132,18 @@ class Stage2ProjectResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class Stage2JudgeScore(BaseModel):
+    project_id: int
+    judge: Optional[str] = None
+    ui_ux_score: float = Field(..., ge=0, le=25)
+    functionality_score: float = Field(..., ge=0, le=25)
+    code_quality_score: float = Field(..., ge=0, le=25)
+    innovation_score: float = Field(..., ge=0, le=25)
+    evaluator_comments: Optional[str] = None
+
+class Stage2BulkEvaluation(BaseModel):
+    scores: List[Stage2JudgeScore] = Field(..., min_length=1, max_length=5000)
+
 
 # Notification Schema
 class NotificationResponse(BaseModel):
@@ -143,6 +158,10 @@ class NotificationResponse(BaseModel):
         from_attributes = True
 
 
+class NotificationsMarkRead(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=500)  # None marks all
+
+
 # Dashboard Response
 class DashboardResponse(BaseModel):
     user: UserResponse
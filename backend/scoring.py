@@ -0,0 +1,52 @@
+"""
+Stage 1 scores aggregated in SQL.
+
+MCQ score is the sum of MCQQuestion.marks over correctly answered
+questions; programming score is the sum of attempt scores (each out of
+PROBLEM_MAX_SCORE). Both are
+scalar subqueries, so one user's scores are a single SELECT and every
+result can be recomputed with a single UPDATE.
+"""
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models import MCQAttempt, MCQQuestion, ProgrammingQuestionAttempt, Stage1Result
+
+PROBLEM_MAX_SCORE = 10
+
+
+def _mcq_score(user_id):
+    return select(func.coalesce(func.sum(MCQQuestion.marks), 0)).select_from(MCQAttempt).join(
+        MCQQuestion, MCQQuestion.id == MCQAttempt.question_id
+    ).where(
+        MCQAttempt.user_id == user_id,
+        MCQAttempt.is_correct.is_(True)
+    ).scalar_subquery()
+
+
+def _programming_score(user_id):
+    return select(func.coalesce(func.sum(ProgrammingQuestionAttempt.score), 0)).where(
+        ProgrammingQuestionAttempt.user_id == user_id
+    ).scalar_subquery()
+
+
+def stage1_scores(db: Session, user_id: int):
+    """(mcq_score, programming_score) for one user"""
+    mcq_score, programming_score = db.execute(
+        select(_mcq_score(user_id), _programming_score(user_id))
+    ).one()
+    return float(mcq_score), float(programming_score)
+
+
+def recompute_stage1_scores(db: Session) -> int:
+    """Recompute every Stage 1 result in one statement; returns rows updated"""
+    mcq_score = _mcq_score(Stage1Result.user_id)
+    programming_score = _programming_score(Stage1Result.user_id)
+    result = db.execute(
+        update(Stage1Result).values(
+            mcq_score=mcq_score,
+            programming_score=programming_score,
+            total_score=mcq_score + programming_score
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -3,7 +3,8 @@ Seed script to populate the database with sample MCQ and programming questions
 """
 from sqlalchemy.orm import Session
 from database import SessionLocal
-from models import MCQQuestion, ProgrammingProblem
+from models import MCQQuestion, ProgrammingProblem, ProgrammingTestCase
+from answer_key import publish_answer_key
 
 def seed_mcq_questions(db: Session):
     """Add sample MCQ questions"""
@@ -198,9 +199,16 @@ You can return the answer in any order.""",
             "marks": 10,
             "input_format": "First line: space-separated integers (array)\nSecond line: target integer",
             "output_format": "Two space-separated integers representing the indices",
+            "checker": "unordered",  # indices may be returned in any order
             "constraints": "2 <= nums.length <= 10^4\n-10^9 <= nums[i] <= 10^9\n-10^9 <= target <= 10^9\nOnly one valid answer exists",
             "sample_input": "2 7 11 15\n9",
             "sample_output": "0 1",
+            "test_cases": [
+                {"input_data": "2 7 11 15\n9", "expected_output": "0 1"},
+                {"input_data": "3 2 4\n6", "expected_output": "1 2"},
+                {"input_data": "3 3\n6", "expected_output": "0 1"},
+                {"input_data": "-1 -2 -3 -4 -5\n-8", "expected_output": "2 4"}
+            ],
             "starter_code_python": """def two_sum(nums, target):
     # Your code here
     pass
@@ -284,6 +292,12 @@ Return "YES" if the string is a palindrome, "NO" otherwise.""",
             "constraints": "1 <= string length <= 1000\nString contains only alphanumeric characters and spaces",
             "sample_input": "A man a plan a canal Panama",
             "sample_output": "YES",
+            "test_cases": [
+                {"input_data": "A man a plan a canal Panama", "expected_output": "YES"},
+                {"input_data": "racecar", "expected_output": "YES"},
+                {"input_data": "hello", "expected_output": "NO"},
+                {"input_data": "No lemon no melon", "expected_output": "YES"}
+            ],
             "starter_code_python": """def is_palindrome(s):
     # Your code here
     pass
@@ -353,6 +367,12 @@ Where each number is the sum of the two preceding ones, starting from 0 and 1.""
             "constraints": "0 <= n <= 50",
             "sample_input": "10",
             "sample_output": "55",
+            "test_cases": [
+                {"input_data": "10", "expected_output": "55"},
+                {"input_data": "0", "expected_output": "0"},
+                {"input_data": "1", "expected_output": "1"},
+                {"input_data": "50", "expected_output": "12586269025"}
+            ],
             "starter_code_python": """def fibonacci(n):
     # Your code here
     pass
@@ -410,7 +430,9 @@ console.log(result);"""
     ]
     
     for p_data in problems:
+        test_cases = p_data.pop("test_cases", [])
         problem = ProgrammingProblem(**p_data)
+        problem.test_cases = [ProgrammingTestCase(**tc) for tc in test_cases]
         db.add(problem)
     
     db.commit()
@@ -439,6 +461,9 @@ def main():
         seed_mcq_questions(db)
         seed_programming_problems(db)
         
+        # Running servers on this host grade from the shared key immediately
+        publish_answer_key(db)
+        
         print("\n✅ Database seeded successfully!")
         print(f"Total MCQ Questions: {db.query(MCQQuestion).count()}")
         print(f"Total Programming Problems: {db.query(ProgrammingProblem).count()}")
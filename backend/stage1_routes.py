@@ -1,27 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from typing import List, Optional
 from datetime import datetime, timedelta
 import json
 
 from database import get_db
 from models import (
-    User, MCQQuestion, ProgrammingProblem, MCQAttempt, 
+    User, ProgrammingProblem, MCQAttempt, 
     ProgrammingQuestionAttempt, Stage1Result, Notification, ActivityLog
 )
 from schemas import (
-    MCQQuestionResponse, MCQAnswerSubmit, ProgrammingProblemResponse,
+    MCQQuestionResponse, MCQAnswerSubmit, MCQBatchSubmit, ProgrammingProblemResponse,
     CodeSubmission, Stage1ResultResponse
 )
-from auth_routes import get_current_user, log_activity
-from ai_evaluator import evaluate_code_with_ai
+from auth_routes import Principal, get_current_user, get_current_principal, get_admin_user, log_activity
+from evaluation_queue import enqueue_evaluation
+from ranking import stage1_rank, stage1_result_response
+from leaderboard_cache import stage1_leaderboard, not_modified
+from question_bank import get_user_mcq_questions, get_user_problems, load_question_bank, problem_exists
+from tab_tracker import record_tab_switch
+from answer_key import answer_key_entries, publish_answer_key
+from scoring import PROBLEM_MAX_SCORE, stage1_scores, recompute_stage1_scores
+from notification_hub import publish_notification
+from dashboard_cache import invalidate_all_dashboards
+from contest_schedule import require_stage_open
+from unread_counter import add_notification
 
 router = APIRouter(prefix="/api/stage1", tags=["Stage 1"])
 
+# Rejects requests outside the Stage 1 windows of the contest schedule
+stage1_open = require_stage_open("stage1")
+
 
 # ============== Start ==============
-@router.post("/start")
+@router.post("/start", dependencies=[Depends(stage1_open)])
 async def start_stage1(
     request: Request,
     current_user: User = Depends(get_current_user),
@@ -36,7 +50,7 @@ async def start_stage1(
 
 # ============== MCQ ROUTES ==============
 
-@router.get("/mcq/questions", response_model=List[MCQQuestionResponse])
+@router.get("/mcq/questions", response_model=List[MCQQuestionResponse], dependencies=[Depends(stage1_open)])
 async def get_mcq_questions(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -54,53 +68,47 @@ async def get_mcq_questions(
             detail="You have already completed Stage 1"
         )
     
-    # Get 10 random MCQ questions
-    questions = db.query(MCQQuestion).order_by(func.rand()).limit(10).all()
-    
-    return questions
+    # Same questions on every reload, served from the in-memory bank
+    return get_user_mcq_questions(db, current_user.id)
+
+
+def _upsert_mcq_attempts(db: Session, rows: list):
+    """INSERT ... ON DUPLICATE KEY UPDATE on (user_id, question_id)"""
+    stmt = mysql_insert(MCQAttempt).values(rows)
+    db.execute(stmt.on_duplicate_key_update(
+        selected_option=stmt.inserted.selected_option,
+        is_correct=stmt.inserted.is_correct,
+        time_taken=stmt.inserted.time_taken,
+        attempted_at=stmt.inserted.attempted_at
+    ))
 
 
-@router.post("/mcq/submit")
+@router.post("/mcq/submit", dependencies=[Depends(stage1_open)])
 async def submit_mcq_answer(
     answer: MCQAnswerSubmit,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Submit answer for an MCQ question"""
-    # Get the question
-    question = db.query(MCQQuestion).filter(
-        MCQQuestion.id == answer.question_id
-    ).first()
+    # Grade against the shared answer key
+    key = answer_key_entries(db, [answer.question_id]).get(answer.question_id)
     
-    if not question:
+    if not key:
         raise HTTPException(status_code=404, detail="Question not found")
+    correct_option, _ = key
     
-    # Check if already answered
-    existing = db.query(MCQAttempt).filter(
-        MCQAttempt.user_id == current_user.id,
-        MCQAttempt.question_id == answer.question_id
-    ).first()
-    
-    is_correct = question.correct_option == answer.selected_option
-    
-    if existing:
-        # Update existing attempt
-        existing.selected_option = answer.selected_option
-        existing.is_correct = is_correct
-        existing.time_taken = answer.time_taken
-        existing.attempted_at = datetime.utcnow()
-    else:
-        # Create new attempt
-        attempt = MCQAttempt(
-            user_id=current_user.id,
-            question_id=answer.question_id,
-            selected_option=answer.selected_option,
-            is_correct=is_correct,
-            time_taken=answer.time_taken
-        )
-        db.add(attempt)
+    is_correct = correct_option == answer.selected_option
     
+    # Insert or replace the answer in one statement
+    _upsert_mcq_attempts(db, [{
+        "user_id": current_user.id,
+        "question_id": answer.question_id,
+        "selected_option": answer.selected_option,
+        "is_correct": is_correct,
+        "time_taken": answer.time_taken,
+        "attempted_at": datetime.utcnow()
+    }])
     db.commit()
     
     # Log activity
@@ -112,13 +120,68 @@ async def submit_mcq_answer(
     return {
         "status": "success",
         "is_correct": is_correct,
-        "correct_option": question.correct_option if is_correct else None
+        "correct_option": correct_option if is_correct else None
+    }
+
+
+@router.post("/mcq/submit-batch", dependencies=[Depends(stage1_open)])
+async def submit_mcq_answers(
+    batch: MCQBatchSubmit,
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Submit several MCQ answers in one transaction"""
+    # Last answer wins if a question appears more than once
+    answers = {a.question_id: a for a in batch.answers}
+
+    correct_options = {
+        question_id: option
+        for question_id, (option, _) in answer_key_entries(db, answers).items()
+    }
+
+    results = []
+    rows = []
+    now = datetime.utcnow()
+    for question_id, answer in answers.items():
+        if question_id not in correct_options:
+            results.append({"question_id": question_id, "status": "not_found"})
+            continue
+        is_correct = correct_options[question_id] == answer.selected_option
+        rows.append({
+            "user_id": current_user.id,
+            "question_id": question_id,
+            "selected_option": answer.selected_option,
+            "is_correct": is_correct,
+            "time_taken": answer.time_taken,
+            "attempted_at": now
+        })
+        results.append({
+            "question_id": question_id,
+            "status": "success",
+            "is_correct": is_correct,
+            "correct_option": correct_options[question_id] if is_correct else None
+        })
+
+    if rows:
+        _upsert_mcq_attempts(db, rows)
+        db.commit()
+
+    log_activity(db, current_user.id, "mcq_answer_batch", {
+        "question_ids": list(correct_options),
+        "correct": sum(1 for r in rows if r["is_correct"])
+    }, request)
+
+    return {
+        "status": "success",
+        "saved": len(rows),
+        "results": results
     }
 
 
 @router.get("/mcq/attempts")
 async def get_mcq_attempts(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Get user's MCQ attempts"""
@@ -136,7 +199,7 @@ async def get_mcq_attempts(
 
 # ============== PROGRAMMING QUESTIONS ROUTES ==============
 
-@router.get("/programming/problems", response_model=List[ProgrammingProblemResponse])
+@router.get("/programming/problems", response_model=List[ProgrammingProblemResponse], dependencies=[Depends(stage1_open)])
 async def get_programming_problems(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -154,20 +217,17 @@ async def get_programming_problems(
             detail="You have already completed Stage 1"
         )
     
-    # Get 2 programming problems
-    problems = db.query(ProgrammingProblem).order_by(func.rand()).limit(2).all()
-    
-    return problems
+    return get_user_problems(db, current_user.id)
 
 
-@router.post("/programming/submit")
+@router.post("/programming/submit", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(stage1_open)])
 async def submit_code(
     submission: CodeSubmission,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
-    """Submit code for a programming problem"""
+    """Store a code submission and queue it for evaluation"""
     # Get the problem
     problem = db.query(ProgrammingProblem).filter(
         ProgrammingProblem.id == submission.problem_id
@@ -176,56 +236,73 @@ async def submit_code(
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     
-    # Check for existing attempt
-    attempt = db.query(ProgrammingQuestionAttempt).filter(
-        ProgrammingQuestionAttempt.user_id == current_user.id,
-        ProgrammingQuestionAttempt.problem_id == submission.problem_id
-    ).first()
-    
-    # Evaluate code using AI
-    evaluation = await evaluate_code_with_ai(
+    # Insert or replace the submission in one statement; LAST_INSERT_ID(id)
+    # makes lastrowid the attempt's id on both paths. A replaced attempt
+    # loses its previous result until the new code is evaluated.
+    stmt = mysql_insert(ProgrammingQuestionAttempt).values(
+        user_id=current_user.id,
+        problem_id=submission.problem_id,
         code=submission.code,
         language=submission.language,
-        problem_description=problem.description,
-        sample_input=problem.sample_input,
-        sample_output=problem.sample_output,
-        constraints=problem.constraints
+        evaluation_state='queued',
+        score=0,
+        updated_at=datetime.utcnow()
     )
-    
-    if attempt:
-        # Update existing attempt
-        attempt.code = submission.code
-        attempt.language = submission.language
-        attempt.status = evaluation['status']
-        attempt.score = evaluation['score']
-        attempt.ai_feedback = evaluation['feedback']
-        attempt.updated_at = datetime.utcnow()
-    else:
-        # Create new attempt
-        attempt = ProgrammingQuestionAttempt(
-            user_id=current_user.id,
-            problem_id=submission.problem_id,
-            code=submission.code,
-            language=submission.language,
-            status=evaluation['status'],
-            score=evaluation['score'],
-            ai_feedback=evaluation['feedback']
-        )
-        db.add(attempt)
-    
+    attempt_id = db.execute(stmt.on_duplicate_key_update(
+        id=func.last_insert_id(ProgrammingQuestionAttempt.id),
+        code=stmt.inserted.code,
+        language=stmt.inserted.language,
+        evaluation_state=stmt.inserted.evaluation_state,
+        score=stmt.inserted.score,
+        status=None,
+        ai_feedback=None,
+        updated_at=stmt.inserted.updated_at
+    )).lastrowid
     db.commit()
-    db.refresh(attempt)
+    
+    enqueue_evaluation(attempt_id)
     
     # Log activity
     log_activity(db, current_user.id, "code_submission", {
         "problem_id": submission.problem_id,
-        "language": submission.language,
-        "score": evaluation['score']
+        "language": submission.language
     }, request)
     
     return {
-        "status": "success",
+        "status": "queued",
+        "attempt_id": attempt_id,
+        "evaluation_state": "queued"
+    }
+
+
+@router.get("/programming/submissions/{attempt_id}")
+async def get_submission_status(
+    attempt_id: int,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Poll the evaluation state of a code submission"""
+    attempt = db.query(ProgrammingQuestionAttempt).filter(
+        ProgrammingQuestionAttempt.id == attempt_id,
+        ProgrammingQuestionAttempt.user_id == current_user.id
+    ).first()
+    
+    if not attempt:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    
+    evaluation = None
+    # feedback_pending: judge-scored, the LLM review is still to come
+    if attempt.evaluation_state in ('done', 'feedback_pending'):
+        evaluation = {
+            "score": float(attempt.score),
+            "status": attempt.status,
+            "feedback": attempt.ai_feedback
+        }
+    
+    return {
         "attempt_id": attempt.id,
+        "problem_id": attempt.problem_id,
+        "evaluation_state": attempt.evaluation_state,
         "evaluation": evaluation
     }
 
@@ -244,51 +321,39 @@ async def get_programming_attempts(
         "problem_id": attempt.problem_id,
         "language": attempt.language,
         "status": attempt.status,
+        "evaluation_state": attempt.evaluation_state,
         "score": float(attempt.score),
         "ai_feedback": attempt.ai_feedback,
         "submitted_at": attempt.submitted_at
     } for attempt in attempts]
 
 
-@router.post("/programming/track-tab")
+@router.post("/programming/track-tab", dependencies=[Depends(stage1_open)])
 async def track_tab_activity(
     problem_id: int,
     request: Request,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db)
 ):
     """Track when user leaves fullscreen/tab"""
-    attempt = db.query(ProgrammingQuestionAttempt).filter(
-        ProgrammingQuestionAttempt.user_id == current_user.id,
-        ProgrammingQuestionAttempt.problem_id == problem_id
-    ).first()
-    
-    if attempt:
-        attempt.tab_inactivity_count += 1
-    else:
-        # Create initial attempt record
-        attempt = ProgrammingQuestionAttempt(
-            user_id=current_user.id,
-            problem_id=problem_id,
-            code="",
-            language="python",
-            tab_inactivity_count=1
-        )
-        db.add(attempt)
-    
-    db.commit()
+    if not problem_exists(db, problem_id):
+        raise HTTPException(status_code=404, detail="Problem not found")
     
-    # Log activity
-    log_activity(db, current_user.id, "tab_switch", {
-        "problem_id": problem_id,
-        "count": attempt.tab_inactivity_count
-    }, request)
+    # Counted in memory and written to the database in batches
+    count = record_tab_switch(
+        current_user.id,
+        problem_id,
+        request.client.host if request.client else None,
+        request.headers.get("user-agent")
+    )
     
-    return {"tab_activity_count": attempt.tab_inactivity_count}
+    return {"tab_activity_count": count}
 
 
 # ============== COMPLETE STAGE 1 ==============
 
+# Not gated: a timer that auto-submits just after the window closes must
+# still record the result of an exam taken inside it
 @router.post("/complete", response_model=Stage1ResultResponse)
 async def complete_stage1(
     request: Request,
@@ -308,20 +373,8 @@ async def complete_stage1(
             detail="You have already completed Stage 1"
         )
     
-    # Calculate MCQ score
-    mcq_attempts = db.query(MCQAttempt).filter(
-        MCQAttempt.user_id == current_user.id
-    ).all()
-    
-    mcq_correct = sum(1 for attempt in mcq_attempts if attempt.is_correct)
-    mcq_score = mcq_correct  # Each MCQ is 1 mark
-    
-    # Calculate Programming score
-    programming_attempts = db.query(ProgrammingQuestionAttempt).filter(
-        ProgrammingQuestionAttempt.user_id == current_user.id
-    ).all()
-    
-    programming_score = sum(float(attempt.score) for attempt in programming_attempts)
+    # MCQ marks and programming scores, aggregated in one query
+    mcq_score, programming_score = stage1_scores(db, current_user.id)
     
     total_score = mcq_score + programming_score
     
@@ -348,46 +401,46 @@ async def complete_stage1(
     db.commit()
     db.refresh(result)
     
-    # Calculate ranks (after all submissions)
-    all_results = db.query(Stage1Result).filter(
-        Stage1Result.completed_at.isnot(None)
-    ).order_by(Stage1Result.total_score.desc()).all()
-    
-    for idx, r in enumerate(all_results, 1):
-        r.rank = idx
-        # Top 50% qualify for Stage 2 (adjust as needed)
-        # r.is_qualified = idx <= len(all_results) // 2
+    # Rank is computed on read; nothing else is rewritten on completion
+    rank = stage1_rank(db, result.total_score)
+    stage1_leaderboard.invalidate()
     
-    db.commit()
-    db.refresh(result)
+    # Out of the marks of this user's own questions
+    max_score = (
+        sum(q["marks"] for q in get_user_mcq_questions(db, current_user.id))
+        + PROBLEM_MAX_SCORE * len(get_user_problems(db, current_user.id))
+    )
     
     # Create notification
     if result.is_qualified:
         notification = Notification(
             user_id=current_user.id,
             title="🎉 Congratulations!",
-            message=f"You've qualified for Round 2! Your score: {total_score}/35, Rank: #{result.rank}",
+            message=f"You've qualified for Round 2! Your score: {total_score:g}/{max_score:g}, Rank: #{rank}",
             type="qualification"
         )
     else:
         notification = Notification(
             user_id=current_user.id,
             title="Stage 1 Completed",
-            message=f"Thank you for participating! Your score: {total_score}/35, Rank: #{result.rank}",
+            message=f"Thank you for participating! Your score: {total_score:g}/{max_score:g}, Rank: #{rank}",
             type="result"
         )
     
-    db.add(notification)
+    add_notification(db, notification)
     db.commit()
+    publish_notification(notification)
     
     # Log activity
     log_activity(db, current_user.id, "stage1_complete", {
         "total_score": float(total_score),
-        "rank": result.rank,
+        "rank": rank,
         "qualified": result.is_qualified
     }, request)
     
-    return Stage1ResultResponse.from_orm(result)
+    response = Stage1ResultResponse.from_orm(result)
+    response.rank = rank
+    return response
 
 
 @router.get("/result", response_model=Stage1ResultResponse)
@@ -403,24 +456,68 @@ async def get_stage1_result(
     if not result:
         raise HTTPException(status_code=404, detail="No result found")
     
-    return Stage1ResultResponse.from_orm(result)
+    return stage1_result_response(db, result)
 
 
 @router.get("/leaderboard")
 async def get_leaderboard(
+    request: Request,
+    response: Response,
     limit: int = 10,
+    after_score: Optional[float] = None,
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Get Stage 1 leaderboard"""
-    results = db.query(Stage1Result, User).join(User).filter(
-        Stage1Result.completed_at.isnot(None)
-    ).order_by(Stage1Result.total_score.desc()).limit(limit).all()
+    """Get Stage 1 leaderboard; pass the last entry's total_score and id to get the next page"""
+    snapshot = stage1_leaderboard.get(db)
     
-    return [{
-        "rank": result.Stage1Result.rank,
-        "user_name": result.User.full_name,
-        "college": result.User.college_name,
-        "total_score": float(result.Stage1Result.total_score),
-        "mcq_score": float(result.Stage1Result.mcq_score),
-        "programming_score": float(result.Stage1Result.programming_score)
-    } for result in results]
\ No newline at end of file
+    if not_modified(request, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": snapshot.etag})
+    
+    response.headers["ETag"] = snapshot.etag
+    response.headers["Cache-Control"] = "no-cache"
+    return snapshot.page(min(max(limit, 1), 100), after_score, after_id)
+
+
+@router.get("/leaderboard/me")
+async def get_my_leaderboard_position(
+    radius: int = 5,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db)
+):
+    """Get the current user's leaderboard entry and the entries around it"""
+    snapshot = stage1_leaderboard.get(db)
+    position, neighbours = snapshot.around_user(current_user.id, min(max(radius, 0), 50))
+    
+    if position is None:
+        raise HTTPException(status_code=404, detail="No completed result found")
+    
+    return {"position": position, "neighbours": neighbours}
+
+
+# ============== ADMIN: QUESTIONS AND SCORES ==============
+
+@router.post("/admin/questions/refresh")
+async def refresh_questions(
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Republish the shared MCQ answer key and reload the question bank (Admin only)"""
+    answer_key_size = publish_answer_key(db)
+    load_question_bank(db)
+    
+    return {"status": "success", "answer_key_questions": answer_key_size}
+
+
+@router.post("/admin/recompute-scores")
+async def recompute_scores(
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Recompute every Stage 1 score from the attempts (Admin only)"""
+    updated = recompute_stage1_scores(db)
+    db.commit()
+    stage1_leaderboard.invalidate()
+    invalidate_all_dashboards()
+    
+    return {"status": "success", "results_updated": updated}
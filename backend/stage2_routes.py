@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, UploadFile, File
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+import csv
+import io
 import os
 import json
 import shutil
@@ -9,11 +13,20 @@ import uuid
 
 from database import get_db
 from models import User, Stage2Project, Stage1Result, Notification
-from schemas import Stage2ProjectSubmit, Stage2ProjectResponse
-from auth_routes import get_current_user, log_activity
+from schemas import Stage2ProjectSubmit, Stage2ProjectResponse, Stage2JudgeScore, Stage2BulkEvaluation
+from auth_routes import get_current_user, get_admin_user, log_activity
+from notification_hub import publish_notification, publish_events, notification_event
+from unread_counter import add_notification, add_notifications
+from stage2_scoring import recompute_stage2_qualification, combine_judge_scores
+from dashboard_cache import invalidate_all_dashboards
+from leaderboard_cache import stage2_leaderboard, not_modified
+from contest_schedule import require_stage_open, stage_deadline
 
 router = APIRouter(prefix="/api/stage2", tags=["Stage 2"])
 
+# Rejects requests outside the Stage 2 windows of the contest schedule
+stage2_open = require_stage_open("stage2")
+
 # Upload directory
 # UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "..", "uploads")
 # os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -39,7 +52,7 @@ def check_stage2_eligibility(user_id: int, db: Session):
 
 # ============== PROJECT ASSIGNMENT ==============
 
-@router.get("/assignment")
+@router.get("/assignment", dependencies=[Depends(stage2_open)])
 async def get_project_assignment(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -53,6 +66,9 @@ async def get_project_assignment(
         Stage2Project.user_id == current_user.id
     ).first()
     
+    # None when the configured Stage 2 window is open-ended
+    deadline = stage_deadline("stage2")
+    
     if not project:
         # Create new project assignment
         project = Stage2Project(
@@ -67,11 +83,16 @@ async def get_project_assignment(
         notification = Notification(
             user_id=current_user.id,
             title="Round 2 Unlocked! 🎉",
-            message="You've qualified for Round 2! Build your mini-application and submit before Feb 13, 2026.",
+            message="You've qualified for Round 2! Build your mini-application and submit"
+                    + (f" before {deadline:%b %d, %Y}." if deadline else " it."),
             type="stage2_unlocked"
         )
-        db.add(notification)
+        add_notification(db, notification)
         db.commit()
+        publish_notification(notification)
+    
+    # Last second of the Stage 2 window
+    last_second = deadline - timedelta(seconds=1) if deadline else None
     
     # Return assignment details
     assignment = {
@@ -106,8 +127,8 @@ async def get_project_assignment(
 3. List of tech stack used
 4. Screenshot uploads (minimum 3)
 
-**Deadline:** February 12, 2026 23:59:59""",
-        "deadline": "2026-02-12T23:59:59",
+**Deadline:** """ + (f"{last_second:%B %d, %Y %H:%M:%S}" if last_second else "Open until further notice"),
+        "deadline": last_second.isoformat() if last_second else None,
         "total_marks": 100,
         "user_project_id": project.id,
         "submission_status": project.submission_status,
@@ -118,7 +139,7 @@ async def get_project_assignment(
 
 # ============== PROJECT SUBMISSION ==============
 
-@router.post("/submit", response_model=Stage2ProjectResponse)
+@router.post("/submit", response_model=Stage2ProjectResponse, dependencies=[Depends(stage2_open)])
 async def submit_project(
     submission: Stage2ProjectSubmit,
     request: Request,
@@ -157,8 +178,9 @@ async def submit_project(
         message=f"Your project '{submission.project_title}' has been submitted. Results will be announced soon.",
         type="stage2_submitted"
     )
-    db.add(notification)
+    add_notification(db, notification)
     db.commit()
+    publish_notification(notification)
     
     # Log activity
     log_activity(db, current_user.id, "stage2_submission", {
@@ -193,7 +215,7 @@ async def get_project_submission(
 
 # ============== UPDATE PROJECT ==============
 
-@router.put("/update", response_model=Stage2ProjectResponse)
+@router.put("/update", response_model=Stage2ProjectResponse, dependencies=[Depends(stage2_open)])
 async def update_project(
     submission: Stage2ProjectSubmit,
     request: Request = None,
@@ -235,34 +257,114 @@ async def update_project(
 
 @router.get("/leaderboard")
 async def get_stage2_leaderboard(
+    request: Request,
     limit: int = 10,
+    after_score: Optional[float] = None,
+    after_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
-    """Get Stage 2 leaderboard"""
-    projects = db.query(Stage2Project, User).join(User).filter(
-        Stage2Project.total_score.isnot(None)
-    ).order_by(Stage2Project.total_score.desc()).limit(limit).all()
-    
-    leaderboard = []
-    for idx, (project, user) in enumerate(projects, 1):
-        leaderboard.append({
-            "rank": idx,
-            "user_name": user.full_name,
-            "college": user.college_name,
-            "project_title": project.project_title,
-            "ui_ux_score": float(project.ui_ux_score) if project.ui_ux_score else 0,
-            "functionality_score": float(project.functionality_score) if project.functionality_score else 0,
-            "code_quality_score": float(project.code_quality_score) if project.code_quality_score else 0,
-            "innovation_score": float(project.innovation_score) if project.innovation_score else 0,
-            "total_score": float(project.total_score) if project.total_score else 0,
-            "is_qualified": project.is_qualified
-        })
-    
-    return leaderboard
+    """Get Stage 2 leaderboard; pass the last entry's total_score and id to get the next page"""
+    snapshot = stage2_leaderboard.get(db)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    
+    if not_modified(request, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(
+        content=snapshot.page_bytes(min(max(limit, 1), 100), after_score, after_id),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 # ============== ADMIN: EVALUATE PROJECT (For testing/demo) ==============
 
+def _apply_evaluations(db: Session, scores: list) -> dict:
+    """Write every project's combined scores, then recompute qualification once"""
+    combined = combine_judge_scores([score.model_dump() for score in scores])
+    
+    projects = dict(db.query(Stage2Project.id, Stage2Project.user_id).filter(
+        Stage2Project.id.in_(combined)
+    ).all())
+    missing = sorted(set(combined) - set(projects))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Projects not found: {missing}")
+    
+    db.execute(update(Stage2Project), [
+        {"id": project_id, **values} for project_id, values in combined.items()
+    ])
+    recompute_stage2_qualification(db)
+    
+    notifications = [
+        Notification(
+            user_id=projects[project_id],
+            title="Round 2 Results Announced! 🎉",
+            message=f"Your project has been evaluated. Total Score: {values['total_score']:.2f}/100",
+            type="stage2_result"
+        )
+        for project_id, values in combined.items()
+    ]
+    add_notifications(db, notifications)
+    db.flush()
+    # Built while the rows are loaded; reading them after the commit would refresh each one
+    events = [notification_event(notification) for notification in notifications]
+    db.commit()
+    invalidate_all_dashboards()
+    stage2_leaderboard.invalidate()
+    
+    publish_events(events)
+    
+    return {
+        "status": "success",
+        "projects_evaluated": len(combined),
+        "scores": {project_id: values["total_score"] for project_id, values in combined.items()}
+    }
+
+
+@router.post("/evaluate/bulk")
+async def evaluate_projects(
+    evaluation: Stage2BulkEvaluation,
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Evaluate many projects at once; several judges' rows per project are averaged (Admin only)"""
+    return _apply_evaluations(db, evaluation.scores)
+
+
+@router.post("/evaluate/bulk-csv")
+async def evaluate_projects_csv(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Same as /evaluate/bulk from a CSV with project_id, judge, the four scores and evaluator_comments (Admin only)"""
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File is not UTF-8 encoded")
+    
+    scores = []
+    reader = csv.DictReader(io.StringIO(text))
+    try:
+        for row in reader:
+            # DictReader keeps cells beyond the header under a None key
+            if None in row:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Line {reader.line_num} has more columns than the header"
+                )
+            scores.append(Stage2JudgeScore(**{key: value for key, value in row.items() if value not in (None, "")}))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+    
+    if not scores:
+        raise HTTPException(status_code=400, detail="No scores in file")
+    
+    return _apply_evaluations(db, scores)
+
+
 @router.post("/evaluate/{project_id}")
 async def evaluate_project(
     project_id: int,
@@ -271,7 +373,7 @@ async def evaluate_project(
     code_quality_score: float,
     innovation_score: float,
     evaluator_comments: str,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_admin_user),
     db: Session = Depends(get_db)
 ):
     """Evaluate a Stage 2 project (Admin/Testing only)"""
@@ -290,15 +392,13 @@ async def evaluate_project(
     project.total_score = ui_ux_score + functionality_score + code_quality_score + innovation_score
     project.evaluator_comments = evaluator_comments
     
-    # Determine qualification (e.g., top 10 for finale)
-    all_projects = db.query(Stage2Project).filter(
-        Stage2Project.total_score.isnot(None)
-    ).order_by(Stage2Project.total_score.desc()).all()
-    
-    for idx, p in enumerate(all_projects, 1):
-        p.is_qualified = idx <= 10  # Top 10 qualify for finale
+    # Determine qualification (top STAGE2_FINALISTS for finale) in one UPDATE
+    recompute_stage2_qualification(db)
     
     db.commit()
+    # Other projects may have gained or lost a finalist place
+    invalidate_all_dashboards()
+    stage2_leaderboard.invalidate()
     
     # Send notification
     notification = Notification(
@@ -307,7 +407,8 @@ async def evaluate_project(
         message=f"Your project has been evaluated. Total Score: {project.total_score}/100",
         type="stage2_result"
     )
-    db.add(notification)
+    add_notification(db, notification)
     db.commit()
+    publish_notification(notification)
     
     return {"status": "success", "total_score": float(project.total_score)}
@@ -0,0 +1,69 @@
+"""
+Stage 2 scores and finalist qualification.
+
+Qualification is recomputed in SQL: one UPDATE marks the
+STAGE2_FINALISTS best-scored projects (ties broken by id) qualified and
+every other project not, however many projects changed. Bulk
+evaluations write every project's scores first and recompute once.
+"""
+import os
+from collections import defaultdict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models import Stage2Project
+
+STAGE2_FINALISTS = int(os.getenv("STAGE2_FINALISTS", 10))
+
+SCORE_FIELDS = ("ui_ux_score", "functionality_score", "code_quality_score", "innovation_score")
+
+
+def recompute_stage2_qualification(db: Session, finalists: int = STAGE2_FINALISTS) -> int:
+    """Flag the top `finalists` scored projects in one statement; returns rows matched.
+
+    Pending ORM changes are flushed first so new scores count. The ranked
+    ids are wrapped in a derived table, which MySQL materializes before
+    updating the same table.
+    """
+    db.flush()
+    ranked = select(
+        Stage2Project.id,
+        func.row_number().over(
+            order_by=(Stage2Project.total_score.desc(), Stage2Project.id)
+        ).label("position")
+    ).where(Stage2Project.total_score.isnot(None)).subquery()
+    finalist_ids = select(ranked.c.id).where(ranked.c.position <= finalists)
+
+    result = db.execute(
+        update(Stage2Project)
+        .values(is_qualified=Stage2Project.id.in_(finalist_ids))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def combine_judge_scores(rows: list) -> dict:
+    """Average several judges' rows per project.
+
+    rows: dicts with project_id, the four SCORE_FIELDS and an optional
+    evaluator_comments / judge. Returns project id -> update values.
+    """
+    by_project = defaultdict(list)
+    for row in rows:
+        by_project[row["project_id"]].append(row)
+
+    combined = {}
+    for project_id, judged in by_project.items():
+        values = {
+            field: round(sum(float(r[field]) for r in judged) / len(judged), 2)
+            for field in SCORE_FIELDS
+        }
+        values["total_score"] = round(sum(values[field] for field in SCORE_FIELDS), 2)
+        comments = [
+            f"{r['judge']}: {r['evaluator_comments']}" if r.get("judge") else r["evaluator_comments"]
+            for r in judged if r.get("evaluator_comments")
+        ]
+        values["evaluator_comments"] = "\n".join(comments)
+        combined[project_id] = values
+    return combined
@@ -0,0 +1,209 @@
+"""
+Write-coalescing tab-switch tracker.
+
+Tab switches are counted in memory and the request returns straight
+away. A background task flushes the aggregated increments every
+TAB_FLUSH_INTERVAL seconds, or as soon as TAB_FLUSH_BATCH events are
+waiting, as one INSERT ... ON DUPLICATE KEY UPDATE that adds each
+user's increment to tab_inactivity_count, and queues one activity log
+row per (user, problem). The database work runs in a thread. Pending
+counts are flushed on shutdown and put back if a flush fails before
+its commit. Rows the database rejects outright (integrity errors) are
+logged and dropped so they can't hold up everyone else's counts.
+"""
+import asyncio
+import os
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import ProgrammingQuestionAttempt
+from activity_log import enqueue_activity
+
+TAB_FLUSH_INTERVAL = float(os.getenv("TAB_FLUSH_INTERVAL", 2))
+TAB_FLUSH_BATCH = int(os.getenv("TAB_FLUSH_BATCH", 500))
+
+_pending = {}   # (user_id, problem_id) -> switches not yet written
+_clients = {}   # (user_id, problem_id) -> (ip address, user agent) of the latest switch
+_totals = {}    # (user_id, problem_id) -> count in the database after our last flush
+_in_flight = {} # (user_id, problem_id) -> switches being written right now
+_pending_events = 0
+_wake = None
+_flusher = None
+
+
+def record_tab_switch(user_id: int, problem_id: int, ip_address: str = None, user_agent: str = None) -> int:
+    """Count a tab switch; returns the user's running count for the problem"""
+    global _pending_events
+    key = (user_id, problem_id)
+    _pending[key] = _pending.get(key, 0) + 1
+    _clients[key] = (ip_address, user_agent)
+    _pending_events += 1
+    if _wake is not None and _pending_events >= TAB_FLUSH_BATCH:
+        _wake.set()
+    return _totals.get(key, 0) + _in_flight.get(key, 0) + _pending[key]
+
+
+class _NotCommitted(Exception):
+    """Some increments were not written; they can safely be retried"""
+
+    def __init__(self, error: Exception, unwritten: dict, written: dict = None):
+        super().__init__(error)
+        self.unwritten = unwritten
+        self.written = written or {}
+
+
+def _take_pending():
+    """Swap out the pending increments (event loop only); None if there are none"""
+    global _pending, _clients, _pending_events
+    if not _pending:
+        return None
+    batch = (_pending, _clients)
+    _pending, _clients, _pending_events = {}, {}, 0
+    for key, n in batch[0].items():
+        _in_flight[key] = _in_flight.get(key, 0) + n
+    return batch
+
+
+def _land(pending: dict):
+    for key, n in pending.items():
+        left = _in_flight.get(key, 0) - n
+        if left > 0:
+            _in_flight[key] = left
+        else:
+            _in_flight.pop(key, None)
+
+
+def _insert_increments(db, increments: dict):
+    stmt = mysql_insert(ProgrammingQuestionAttempt).values([
+        {
+            "user_id": user_id,
+            "problem_id": problem_id,
+            "code": "",
+            "language": "python",
+            "tab_inactivity_count": n
+        }
+        for (user_id, problem_id), n in increments.items()
+    ])
+    db.execute(stmt.on_duplicate_key_update(
+        tab_inactivity_count=func.coalesce(ProgrammingQuestionAttempt.tab_inactivity_count, 0)
+        + stmt.inserted.tab_inactivity_count
+    ))
+    db.commit()
+
+
+def _insert_rows_separately(db, pending: dict) -> dict:
+    """Write each increment on its own, dropping rows the database rejects"""
+    written = {}
+    keys = list(pending)
+    for i, key in enumerate(keys):
+        try:
+            _insert_increments(db, {key: pending[key]})
+        except IntegrityError as e:
+            db.rollback()
+            print(f"⚠️  Dropping {pending[key]} tab switches for user {key[0]}, problem {key[1]}: {e.orig}")
+            continue
+        except Exception as e:
+            db.rollback()
+            raise _NotCommitted(e, {k: pending[k] for k in keys[i:]}, written) from e
+        written[key] = pending[key]
+    return written
+
+
+def _write_increments(pending: dict):
+    """Add the increments in one statement; returns (written, new totals).
+
+    Blocking, so the flush loop runs it in a thread. If one row breaks
+    the statement (e.g. the user was deleted while their token is still
+    valid) the rows are written one at a time and the bad ones dropped.
+    Raises _NotCommitted for increments whose commit did not happen; a
+    failed read-back afterwards just leaves the cached totals stale.
+    """
+    db = SessionLocal()
+    try:
+        written = pending
+        try:
+            _insert_increments(db, pending)
+        except IntegrityError:
+            db.rollback()
+            written = _insert_rows_separately(db, pending)
+        except Exception as e:
+            db.rollback()
+            raise _NotCommitted(e, pending) from e
+        if not written:
+            return written, {}
+
+        try:
+            rows = db.query(
+                ProgrammingQuestionAttempt.user_id,
+                ProgrammingQuestionAttempt.problem_id,
+                ProgrammingQuestionAttempt.tab_inactivity_count
+            ).filter(
+                tuple_(ProgrammingQuestionAttempt.user_id, ProgrammingQuestionAttempt.problem_id).in_(list(written))
+            ).all()
+        except Exception as e:
+            print(f"⚠️  Tab switch totals could not be read back: {e}")
+            return written, {}
+        return written, {(user_id, problem_id): count or 0 for user_id, problem_id, count in rows}
+    finally:
+        db.close()
+
+
+def _put_back(unwritten: dict, clients: dict, error: Exception):
+    """Return unwritten increments, merged with anything recorded meanwhile"""
+    global _pending_events
+    print(f"⚠️  Tab switch flush failed, will retry: {error}")
+    for key, n in unwritten.items():
+        _pending[key] = _pending.get(key, 0) + n
+        _clients.setdefault(key, clients[key])
+        _pending_events += n
+
+
+async def flush_tab_switches() -> int:
+    """Write pending increments to the database; returns events written"""
+    batch = _take_pending()
+    if batch is None:
+        return 0
+    pending, clients = batch
+    try:
+        # Off the event loop so request handlers keep running
+        written, totals = await asyncio.to_thread(_write_increments, pending)
+        unwritten, error = {}, None
+    except _NotCommitted as e:
+        written, totals, unwritten, error = e.written, {}, e.unwritten, e
+    _land(pending)
+    _totals.update(totals)
+    for (user_id, problem_id), n in written.items():
+        enqueue_activity(user_id, "tab_switch", {"problem_id": problem_id, "switches": n}, *clients[(user_id, problem_id)])
+    if unwritten:
+        _put_back(unwritten, clients, error)
+    return sum(written.values())
+
+
+async def _flush_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_wake.wait(), TAB_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
+        await asyncio.shield(flush_tab_switches())
+
+
+async def start_tab_tracker():
+    """Start the periodic flush task"""
+    global _wake, _flusher
+    _wake = asyncio.Event()
+    _flusher = asyncio.create_task(_flush_loop())
+
+
+async def stop_tab_tracker():
+    """Stop the flush task and write whatever is still pending"""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        await asyncio.gather(_flusher, return_exceptions=True)
+        _flusher = None
+    await flush_tab_switches()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, cooldown=0)
+    breaker.before_call()
+    breaker.record_failure(0.1)
+    assert not breaker.is_open()
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = _half_open_breaker()
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+    assert breaker.state == "closed"
+
+
+def test_failed_trial_reopens():
+    breaker = _half_open_breaker()
+    breaker.cooldown = 60
+    breaker.before_call()
+    breaker.record_failure(0.1)
+    assert breaker.state == "open"
+    assert breaker.is_open()
+
+
+def test_released_trial_frees_the_slot():
+    breaker = _half_open_breaker()
+    breaker.before_call()
+    breaker.release_trial()
+    assert breaker.state == "half_open"
+    breaker.before_call()
+
+
+def test_cancelled_half_open_request_releases_the_trial(monkeypatch):
+    ai_evaluator = pytest.importorskip("ai_evaluator")
+    breaker = _half_open_breaker()
+    monkeypatch.setattr(ai_evaluator, "ai_breaker", breaker)
+
+    class HangingCompletions:
+        async def create(self, **kwargs):
+            await asyncio.Event().wait()
+
+    class HangingLLM:
+        class chat:
+            completions = HangingCompletions()
+
+    async def cancel_trial():
+        task = asyncio.create_task(ai_evaluator._request_evaluation("prompt", HangingLLM()))
+        await asyncio.sleep(0.01)
+        assert breaker.is_open()  # the trial is in flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert not breaker.is_open()
+    breaker.before_call()
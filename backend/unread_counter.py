@@ -0,0 +1,82 @@
+"""
+Per-user unread notification counter.
+
+users.unread_notifications is kept in step with the notifications table
+inside the same transaction: add_notification() bumps it when a row is
+created and mark_read() lowers it by however many rows it actually
+flipped, so the dashboard reads the count from the user's row instead
+of counting notifications.
+"""
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from models import User, Notification
+from dashboard_cache import invalidate_dashboard_on_commit
+
+
+def add_notification(db: Session, notification: Notification):
+    """Stage a new notification and count it as unread (caller commits)"""
+    db.add(notification)
+    db.execute(
+        update(User)
+        .where(User.id == notification.user_id)
+        .values(unread_notifications=User.unread_notifications + 1)
+    )
+
+
+def add_notifications(db: Session, notifications: list):
+    """Stage many notifications; the counters are bumped in one executemany.
+
+    created_at is taken from the database clock once for the whole batch
+    instead of per-row server defaults, so the rows are complete after a
+    flush and building their events costs no refresh SELECTs.
+    """
+    created_at = db.execute(select(func.now())).scalar()
+    for notification in notifications:
+        if notification.created_at is None:
+            notification.created_at = created_at
+    db.add_all(notifications)
+    db.execute(
+        update(User.__table__)
+        .where(User.__table__.c.id == bindparam("notified_user_id"))
+        .values(unread_notifications=User.__table__.c.unread_notifications + 1),
+        [{"notified_user_id": n.user_id} for n in notifications]
+    )
+
+
+def mark_read(db: Session, user_id: int, ids: Optional[list] = None) -> int:
+    """Mark the user's notifications read (all of them when ids is None).
+
+    One UPDATE over the unread rows; returns how many changed. The
+    caller commits.
+    """
+    stmt = update(Notification).where(
+        Notification.user_id == user_id,
+        Notification.is_read == False
+    )
+    if ids is not None:
+        if not ids:
+            return 0
+        stmt = stmt.where(Notification.id.in_(ids))
+    changed = db.execute(
+        stmt.values(is_read=True).execution_options(synchronize_session=False)
+    ).rowcount
+
+    if changed:
+        invalidate_dashboard_on_commit(db, user_id)
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(unread_notifications=func.greatest(User.unread_notifications - changed, 0))
+        )
+    return changed
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    """The user's unread count, read from their row by primary key"""
+    return db.execute(
+        select(User.unread_notifications).where(User.id == user_id)
+    ).scalar() or 0
+
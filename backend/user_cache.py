@@ -0,0 +1,61 @@
+"""
+Per-process cache of authenticated users.
+
+get_current_user resolves the JWT's user id through this LRU before
+touching the database. Entries are User rows detached from their
+session, so they are safe to read after the request that loaded them
+ends; they expire after USER_CACHE_TTL seconds, and anything that
+changes a user calls invalidate_user(). Other workers pick up the
+change when their entry expires.
+"""
+import os
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from models import User
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+
+_users = OrderedDict()  # user id -> (loaded at, detached User)
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get_cached_user(db: Session, user_id: int):
+    """The user with this id, from cache or the database (None if missing)"""
+    entry = _users.get(user_id)
+    if entry and time.monotonic() - entry[0] < USER_CACHE_TTL:
+        _users.move_to_end(user_id)
+        _stats["hits"] += 1
+        return entry[1]
+
+    _stats["misses"] += 1
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        _users.pop(user_id, None)
+        return None
+
+    # Detach with every column loaded so later commits can't expire it
+    db.expunge(user)
+    _users[user_id] = (time.monotonic(), user)
+    _users.move_to_end(user_id)
+    while len(_users) > USER_CACHE_SIZE:
+        _users.popitem(last=False)
+    return user
+
+
+def invalidate_user(user_id: int):
+    """Drop a user so the next request reloads it"""
+    if _users.pop(user_id, None):
+        _stats["invalidations"] += 1
+
+
+def user_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "entries": len(_users),
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0
+    }
@@ -28,6 +28,8 @@ const app = createApp({
             notifications: [],
             notificationCount: 0,
             showNotifications: false,
+            notificationStream: null,
+            lastNotificationEventId: null,
             leaderboard: [],
             stage2Leaderboard: [],
             profileForm: {
@@ -79,6 +81,7 @@ const app = createApp({
 
                 // Load dashboard
                 await this.loadDashboard();
+                this.openNotificationStream();
                 
                 // Show success message
                 showToast('Login successful!', '#4BB543');
@@ -120,14 +123,17 @@ const app = createApp({
                 this.notifications = response.data;
                 this.showNotifications = true;
                 
-                // Mark all as read
-                for (const notification of this.notifications) {
-                    if (!notification.is_read) {
-                        await axios.put(`${API_BASE_URL}/notifications/${notification.id}/read`);
-                    }
+                // Mark the displayed ones as read in one request; anything
+                // not shown here (or arriving meanwhile) stays unread
+                const unreadIds = this.notifications
+                    .filter(notification => !notification.is_read)
+                    .map(notification => notification.id);
+                if (unreadIds.length) {
+                    const marked = await axios.put(`${API_BASE_URL}/notifications/read`, { ids: unreadIds });
+                    this.notificationCount = marked.data.unread;
+                } else {
+                    this.notificationCount = 0;
                 }
-                
-                this.notificationCount = 0;
             } catch (error) {
                 console.error('Failed to load notifications:', error);
             } finally {
@@ -135,6 +141,41 @@ const app = createApp({
             }
         },
 
+        async openNotificationStream() {
+            // New notifications are pushed by the server instead of polled
+            if (this.notificationStream || !this.token) return;
+            // The stream URL carries a short-lived ticket, never the access token
+            let ticket;
+            try {
+                const response = await axios.post(`${API_BASE_URL}/notifications/stream-ticket`);
+                ticket = response.data.ticket;
+            } catch (error) {
+                console.error('Failed to open notification stream:', error);
+                return;
+            }
+            if (this.notificationStream || !this.token) return;
+            let url = `${API_BASE_URL}/notifications/stream?ticket=${encodeURIComponent(ticket)}`;
+            if (this.lastNotificationEventId) {
+                url += `&last_event_id=${encodeURIComponent(this.lastNotificationEventId)}`;
+            }
+            const stream = new EventSource(url);
+            this.notificationStream = stream;
+            stream.addEventListener('notification', (event) => {
+                this.lastNotificationEventId = event.lastEventId;
+                const notification = JSON.parse(event.data);
+                this.notifications = [notification, ...this.notifications].slice(0, 20);
+                this.notificationCount += 1;
+                showToast(notification.title, '#4BB543');
+            });
+            stream.onerror = () => {
+                // The browser gives up once a reconnect is refused (e.g. the
+                // ticket expired); reopen with a fresh ticket
+                if (stream.readyState !== EventSource.CLOSED || this.notificationStream !== stream) return;
+                this.notificationStream = null;
+                setTimeout(() => this.openNotificationStream(), 5000);
+            };
+        },
+
         populateProfileForm() {
             if (this.user) {
                 this.profileForm = {
@@ -184,6 +225,10 @@ const app = createApp({
         },
 
         logout() {
+            if (this.notificationStream) {
+                this.notificationStream.close();
+                this.notificationStream = null;
+            }
             this.isAuthenticated = false;
             this.user = null;
             this.token = null;
@@ -206,6 +251,7 @@ const app = createApp({
                 
                 // Load dashboard
                 this.loadDashboard();
+                this.openNotificationStream();
             }
         },
 
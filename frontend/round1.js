@@ -14,6 +14,9 @@ const state = {
     mcqQuestions: [],
     currentMCQIndex: 0,
     mcqAnswers: {}, // { questionId: 'A/B/C/D' }
+    pendingMCQAnswers: {}, // answers not yet sent to the server
+    mcqFlushTimer: null,
+    mcqFlushInFlight: null, // promise of the batch currently being sent
     
     // Programming
     programmingProblems: [],
@@ -118,16 +121,99 @@ async function loadProgrammingProblems() {
     }
 }
 
-async function submitMCQAnswer(questionId, selectedOption) {
-    try {
-        await axios.post(`${API_BASE_URL}/stage1/mcq/submit`, {
-            question_id: questionId,
-            selected_option: selectedOption,
-            time_taken: null
+function submitMCQAnswer(questionId, selectedOption) {
+    // Answers are sent in batches; a burst of clicks becomes one request
+    state.pendingMCQAnswers[questionId] = selectedOption;
+    if (!state.mcqFlushTimer) {
+        state.mcqFlushTimer = setTimeout(flushMCQAnswers, 3000);
+    }
+}
+
+function takePendingMCQAnswers() {
+    clearTimeout(state.mcqFlushTimer);
+    state.mcqFlushTimer = null;
+    
+    const pending = state.pendingMCQAnswers;
+    state.pendingMCQAnswers = {};
+    const answers = Object.entries(pending).map(([questionId, selectedOption]) => ({
+        question_id: Number(questionId),
+        selected_option: selectedOption,
+        time_taken: null
+    }));
+    return { pending, answers };
+}
+
+function restorePendingMCQAnswers(pending) {
+    // Keep them for the next flush unless the user has answered again since
+    state.pendingMCQAnswers = { ...pending, ...state.pendingMCQAnswers };
+}
+
+function flushMCQAnswers() {
+    // Resolves to false if the batch could not be saved
+    const { pending, answers } = takePendingMCQAnswers();
+    if (answers.length === 0) return Promise.resolve(true);
+    
+    const flush = axios.post(`${API_BASE_URL}/stage1/mcq/submit-batch`, { answers })
+        .then(() => true)
+        .catch(error => {
+            console.error('Failed to submit MCQ answers:', error);
+            restorePendingMCQAnswers(pending);
+            return false;
+        })
+        .finally(() => {
+            if (state.mcqFlushInFlight === flush) state.mcqFlushInFlight = null;
         });
-    } catch (error) {
-        console.error('Failed to submit MCQ answer:', error);
+    state.mcqFlushInFlight = flush;
+    return flush;
+}
+
+async function flushAllMCQAnswers() {
+    // Wait for a timer flush already on the wire (its answers come back to
+    // pending if it failed), then send whatever is left
+    if (state.mcqFlushInFlight) {
+        await state.mcqFlushInFlight;
+    }
+    return flushMCQAnswers();
+}
+
+function flushMCQAnswersOnExit() {
+    // Requests made through axios are cancelled with the page; a keepalive
+    // fetch is allowed to finish after it has gone
+    const { pending, answers } = takePendingMCQAnswers();
+    if (answers.length === 0 || !state.token) return;
+    
+    fetch(`${API_BASE_URL}/stage1/mcq/submit-batch`, {
+        method: 'POST',
+        keepalive: true,
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${state.token}`
+        },
+        body: JSON.stringify({ answers })
+    }).then(response => {
+        if (!response.ok) restorePendingMCQAnswers(pending);
+    }).catch(() => restorePendingMCQAnswers(pending));
+}
+
+const EVALUATION_TIMEOUT_MS = 3 * 60 * 1000;
+
+async function waitForEvaluation(attemptId) {
+    // Submissions are evaluated in the background; poll until a result is ready
+    const deadline = Date.now() + EVALUATION_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        const response = await axios.get(`${API_BASE_URL}/stage1/programming/submissions/${attemptId}`);
+        
+        if (['done', 'feedback_pending'].includes(response.data.evaluation_state)) {
+            return response.data.evaluation;
+        }
+        if (response.data.evaluation_state === 'failed') {
+            throw new Error('Evaluation failed');
+        }
     }
+    const error = new Error('Evaluation timed out');
+    error.evaluationTimeout = true;
+    throw error;
 }
 
 async function submitCode() {
@@ -149,7 +235,8 @@ async function submitCode() {
             language: state.selectedLanguage
         });
         
-        state.codeResult = response.data.evaluation;
+        document.getElementById('submitCodeBtn').textContent = 'Evaluating...';
+        state.codeResult = await waitForEvaluation(response.data.attempt_id);
         state.programmingSubmissions[state.programmingProblems[state.currentProblemIndex].id] = {
             code: code,
             language: state.selectedLanguage,
@@ -162,7 +249,12 @@ async function submitCode() {
         
     } catch (error) {
         console.error('Failed to submit code:', error);
-        showToast('Failed to submit code. Please try again.', '#EF4444');
+        if (error.evaluationTimeout) {
+            // The submission is saved; its score is counted once evaluation finishes
+            showToast('Code submitted. Evaluation is taking longer than usual; your score will be updated automatically.', '#F59E0B');
+        } else {
+            showToast('Failed to submit code. Please try again.', '#EF4444');
+        }
     } finally {
         document.getElementById('submitCodeBtn').disabled = false;
         document.getElementById('submitCodeBtn').textContent = 'Submit Code';
@@ -202,6 +294,11 @@ function confirmSubmitExam() {
 async function submitExam() {
     try {
         document.getElementById('global-loader').style.display = 'flex';
+        if (!(await flushAllMCQAnswers())) {
+            // Completing now would score the exam without these answers
+            showToast('Some answers could not be saved. Check your connection and submit again.', '#EF4444');
+            return;
+        }
         await axios.post(`${API_BASE_URL}/stage1/complete`);
         
         // Stop timer
@@ -551,3 +648,13 @@ window.addEventListener('beforeunload', () => {
         clearInterval(state.timerInterval);
     }
 });
+
+// Send buffered answers before the page goes away (reload, closed tab).
+// pagehide also fires where beforeunload doesn't (mobile, bfcache), and a
+// hidden tab may be discarded without either.
+window.addEventListener('pagehide', flushMCQAnswersOnExit);
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        flushMCQAnswersOnExit();
+    }
+});